@@ -1,21 +1,183 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import json
-import os
+from tkinter import ttk, messagebox
+import tkinter.font as tkfont
+import bisect
+import itertools
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import date, datetime
 from typing import Optional
 
+from todolist import FileWatcher, Task, TodoList, TrigramIndex, apply_records, diff_tasks, format_date, parse_date
+
+SEARCH_DELAY_MS = 200                  # the search starts when nothing was typed during this delay
+SEARCH_MAX_ERRORS = 1                  # typos allowed per searched word (only in words of 6 letters or more)
+RESULT_CACHE_SIZE = 32                 # filter/sort/search results kept, the least recently used is dropped first
+SAVE_DELAY_MS = 500                    # the changes made during this delay are written together
+WORKER_POLL_MS = 50                    # how often the window checks for the results of the file thread
+CLOSE_TIMEOUT_S = 10                   # seconds the closing window waits for the file thread before asking the user
+
+
+class TaskListView(tk.Frame):
+    """scrollable list of tasks where only the visible tasks are drawn (on a canvas)"""
+    PADDING = 10
+    SEPARATOR = "─" * 80
+
+    def __init__(self, master, colors, **kwargs):
+        super().__init__(master, **kwargs)
+        self.colors = colors
+        self.font = tkfont.Font(family="Consolas", size=10)
+        self.done_font = tkfont.Font(family="Consolas", size=10, overstrike=True)
+        self.title_font = tkfont.Font(family="Arial", size=11, weight="bold")
+        self.line_height = max(self.font.metrics("linespace"), self.title_font.metrics("linespace"))
+        
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", lambda event: self.yview("scroll", -event.delta // 120, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.yview("scroll", 1, "units"))
+        
+        self.tasks = []
+        self.offsets = [0]   # offsets[i] = y of the top of tasks[i], offsets[-1] = total height
+        self.top = 0         # y of the list shown at the top of the canvas
+    
+    def set_tasks(self, tasks):
+        """shows a new list of tasks (only their heights are computed, nothing is drawn outside the view)"""
+        self.tasks = tasks
+        self.offsets = [0, *itertools.accumulate(self._task_height(task) for task in tasks)]
+        self.top = min(self.top, self._max_top())
+        self.redraw()
+    
+    def _task_height(self, task):
+        """height of a task and the separator after it, without building its lines"""
+        lines = 3 + (task.theme != "default") + (task.deadline is not None) + (task.priority != 0)
+        return (lines + 3) * self.line_height
+    
+    def _task_lines(self, task):
+        """lines of a task, each line = list of (text, tags), same tags as the old text area"""
+        color = task.color
+        done = task.done
+        text_tags = ("done", color) if done else (color, "title")
+        lines = [[(f"📌 ID: {task.id} | ", (color,)), (task.text, text_tags)]]
+        status = "✅ Done" if done else "⏳ In progress"
+        lines.append([(f"Status: {status}", (color,))])
+        if task.theme != "default":
+            lines.append([(f"📁 Theme: {task.theme}", (color,))])
+        lines.append([(f"📅 Created on: {format_date(task.date)}", (color,))])
+        if task.deadline is not None:
+            if task.deadline <= date.today() and not done:
+                lines.append([(f"⚠️ DEADLINE: {format_date(task.deadline)}", ("urgent", color))])
+            else:
+                lines.append([(f"⏰ Deadline: {format_date(task.deadline)}", (color,))])
+        if task.priority != 0:
+            lines.append([(f"Priority: {task.priority}/5", (color,))])
+        lines += [[], [(self.SEPARATOR, ())], []]
+        return lines
+    
+    def _style(self, tags):
+        """(font, text color, background) of a text from its tags"""
+        font = self.font
+        fill = "#000000"
+        for tag in tags:
+            if tag in self.colors:
+                fill = self.colors[tag]
+        if "title" in tags:
+            font = self.title_font
+        if "done" in tags:
+            font, fill = self.done_font, "#808080"
+        return font, fill, "#ffcccc" if "urgent" in tags else None
+    
+    def redraw(self):
+        """draws the tasks visible in the canvas"""
+        canvas = self.canvas
+        canvas.delete("all")
+        height = canvas.winfo_height()
+        if not self.tasks:
+            canvas.create_text(self.PADDING, self.PADDING, text="No tasks to display.",
+                               anchor=tk.NW, font=self.title_font)
+        else:
+            first = bisect.bisect_right(self.offsets, self.top) - 1
+            for i in range(first, len(self.tasks)):
+                y = self.offsets[i] - self.top + self.PADDING
+                if y >= height:
+                    break
+                for line in self._task_lines(self.tasks[i]):
+                    x = self.PADDING
+                    for text, tags in line:
+                        font, fill, background = self._style(tags)
+                        item = canvas.create_text(x, y, text=text, anchor=tk.NW, font=font, fill=fill)
+                        if background:
+                            canvas.tag_lower(canvas.create_rectangle(canvas.bbox(item), fill=background, width=0))
+                        x += font.measure(text)
+                    y += self.line_height
+        self._update_scrollbar()
+    
+    def _max_top(self):
+        return max(0, self.offsets[-1] + 2 * self.PADDING - self.canvas.winfo_height())
+    
+    def _update_scrollbar(self):
+        total = self.offsets[-1] + 2 * self.PADDING
+        height = self.canvas.winfo_height()
+        if total <= height:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.top / total, (self.top + height) / total)
+    
+    def yview(self, *args):
+        """scrollbar / mouse wheel command ("moveto", fraction) or ("scroll", number, "units"/"pages")"""
+        total = self.offsets[-1] + 2 * self.PADDING
+        if args[0] == "moveto":
+            top = float(args[1]) * total
+        elif args[0] == "scroll":
+            step = self.canvas.winfo_height() if args[2] == "pages" else 3 * self.line_height
+            top = self.top + int(args[1]) * step
+        else:
+            return
+        self.top = int(min(max(top, 0), self._max_top()))
+        self.redraw()
+
+
 class TodoListGUI:
-    def __init__(self, master, file_path: str = "ToDoList.json"):
+    def __init__(self, master, file_path: str = "ToDoList.json", journal: bool = False, backups: int = 0):
         self.master = master
         self.master.title("ToDo List Manager")
         self.master.geometry("1100x900")
         self.master.configure(bg="#f0f0f0")
         
-        self.file_path = file_path
-        self.tasks = []
-        self.tasks_by_id = {}
-        self._load()
+        # the task engine shared with the command-line version (todolist package), its files are read by the worker
+        self.todo = TodoList(file_path, journal=journal, backups=backups, load=False)
+        
+        # the files are read and written by a worker thread, the window only sends it commands
+        #   ("load",) / ("check",) / ("save", records, copy of every task or None) / ("close",)
+        #   ("index", store, copy of the list of its tasks, store version) : its trigram index, for the search
+        # and gets back through _results :
+        #   ("loaded", store, or None if the file didn't change) / ("error", message)
+        #   ("changed", None if the file didn't change, else (records appended by another program, or None
+        #               and every task read again : see read_appended))
+        #   ("saved", None, or the store read again if another program changed the file, with the records on top)
+        #   ("indexed", (store, TrigramIndex, version)) : kept if the store didn't change meanwhile (else built again)
+        # one command at a time : the changes made meanwhile wait in _pending
+        self._commands = queue.Queue()
+        self._results = queue.Queue()
+        self._busy = False          # a command was sent, its result didn't come back yet
+        self._pending = []          # records of the changes not sent to the worker yet
+        self._saving = None         # records of the save in flight : back in _pending if it fails
+        self._save_job = None       # after() job sending them
+        self._deadlines_checked = False
+        self._closing = False       # _on_close takes the results itself, even while its dialogs are open
+        self._worker = threading.Thread(target=self._work, name="todo-files", daemon=True)
+        self._worker.start()
+        # another program writing the todoList (or its journal, or the SQLite log) wakes up the window
+        self._file_changed = threading.Event()
+        self._watcher = FileWatcher([file_path, self.todo.journal_path, file_path + "-wal"], self._file_changed.set)
+        
+        self._search_job = None  # pending after() job of the search bar
+        self._result_cache = OrderedDict()  # (search, filter, filter params, sort, store version) -> tasks shown
         
         # color configuration
         self.colors = {
@@ -30,32 +192,205 @@ class TodoListGUI:
         }
         
         self.setup_ui()
-        self._check_deadlines()
+        self.master.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._poll_worker()
         
+    def _work(self):
+        """worker thread : runs the commands of the window one by one, in order"""
+        while True:
+            command = self._commands.get()
+            try:
+                if command[0] == "load":
+                    # nothing is parsed if the file is the one already shown
+                    self._results.put(("loaded", self.todo.read_store() if self.todo.changed_on_disk() else None))
+                elif command[0] == "check":
+                    # only the lines appended since the last read when possible, else every task
+                    changes = None
+                    if self.todo.changed_on_disk():
+                        records = self.todo.read_appended()
+                        changes = (records, self.todo.read_store().tasks if records is None else None)
+                    self._results.put(("changed", changes))
+                elif command[0] == "save":
+                    self._results.put(("saved", self.todo.write_changes(command[1], command[2])))
+                elif command[0] == "index":
+                    # the first search would build it in the Tk thread (seconds for a big todoList)
+                    store, tasks, version = command[1:]
+                    self._results.put(("indexed", (store, TrigramIndex(tasks), version)))
+            except (OSError, sqlite3.Error) as e:
+                self._results.put(("error", str(e)))
+            except Exception as e:      # a bug or a damaged file : the window must still get an answer, or it waits forever
+                self._results.put(("error", f"{type(e).__name__} : {e}"))
+            if command[0] == "close":
+                return
+    
+    def _poll_worker(self):
+        """handles the results of the worker thread (in the Tk thread), and asks it to read the file if it changed"""
+        if self._closing:
+            return
+        while True:
+            try:
+                kind, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_result(kind, value)
+        # with changes waiting, the save merges the file anyway
+        if self._file_changed.is_set() and not self._busy and not self._pending:
+            self._file_changed.clear()
+            self._send(("check",))
+        elif not self._busy and not self._pending and not self.store.has_trigram_index():
+            self._send(("index", self.store, list(self.tasks), self.store.version))
+        self.master.after(WORKER_POLL_MS, self._poll_worker)
+    
+    def _handle_result(self, kind, value):
+        """one result of the worker thread (see __init__)"""
+        self._busy = False
+        if kind == "loaded":
+            self._on_loaded(value)
+        elif kind == "changed":
+            self._on_file_changed(value)
+        elif kind == "saved":
+            self._saving = None
+            if not self._pending and self._save_job is None:
+                self.status_var.set(f"{len(self.store)} tasks - all changes saved")
+            if value is not None:       # merged with the changes of another program
+                self._on_file_changed((diff_tasks(self.store, value.tasks), None))
+        elif kind == "indexed":
+            store, index, version = value
+            if store is self.store:
+                store.set_trigram_index(index, version)
+        elif kind == "error":
+            save_failed = self._restore_failed_save()
+            self.status_var.set("Save failed - retried with the next change" if save_failed else "File error")
+            messagebox.showerror("File error", value)
+            if save_failed:     # not retried right away : a full disk would fail again and again
+                return
+        if self._pending and self._save_job is None:     # changes made during the command
+            self._flush()
+
+    def _restore_failed_save(self):
+        """the records of the save that failed go back in front of the pending ones, return True if there were some"""
+        if self._saving is None:
+            return False
+        self._pending, self._saving = self._saving + self._pending, None
+        return True
+    
+    def _send(self, command):
+        self._busy = True
+        self._commands.put(command)
+    
     def _load(self):
-        """loads tasks from JSON file"""
-        if not os.path.exists(self.file_path):
-            self.tasks = []
-            self._reindex()
+        """asks the worker to load the tasks"""
+        self.status_var.set("Loading tasks...")
+        for button in self._edit_buttons:
+            button.config(state=tk.DISABLED)
+        self._send(("load",))
+    
+    def _on_loaded(self, store):
+        """store = the tasks read by the worker, None if the file didn't change"""
+        if store is not None:
+            self.todo.store = store
+            self._result_cache.clear()     # the versions of the new store start again from 1
+        for button in self._edit_buttons:
+            button.config(state=tk.NORMAL)
+        self.status_var.set(f"{len(self.store)} tasks")
+        self.apply_filter_sort()
+        if self.todo.recovered_from:
+            messagebox.showwarning("Recovery", f"The task file was damaged, tasks were recovered from {self.todo.recovered_from}")
+            self.todo.recovered_from = None
+        if self.todo.moved_aside:
+            messagebox.showwarning("Recovery", f"The task file couldn't be read, it was moved to {self.todo.moved_aside}")
+            self.todo.moved_aside = None
+        if not self._deadlines_checked:     # only when the window opens, not on each refresh
+            self._deadlines_checked = True
+            self._check_deadlines()
+    
+    def _on_file_changed(self, changes):
+        """
+        changes = (records, tasks) read by the worker (see __init__), None if the file didn't change
+        only the tasks that changed are replaced in the store, and the list is redrawn only if what it shows changed
+        """
+        if changes is None:
+            return
+        if self._pending:
+            # changed here while the worker was reading : the store would miss them, the next save merges everything
+            self.todo.disk_state = None
             return
-        try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            self.tasks = data.get("tasks", []) if isinstance(data, dict) else []
-            self._reindex()
-        except (json.JSONDecodeError, OSError):
-            self.tasks = []
-            self.tasks_by_id = {}
-    
-    def _reindex(self):
-        """rebuilds task index by ID"""
-        self.tasks_by_id = {t["id"]: t for t in self.tasks}
-    
-    def _save(self):
-        """saves tasks to JSON file"""
-        data = {"tasks": self.tasks}
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        records, tasks = changes
+        if records is None:
+            records = diff_tasks(self.store, tasks)
+        if not records:
+            return
+        apply_records(self.store, records)
+        tasks = self._visible_tasks()
+        if tasks != self.task_display.tasks:    # a changed task is a new Task object : same list = same display
+            self.display_tasks(tasks)
+        self.status_var.set(f"{len(self.store)} tasks - {len(records)} changed by another program")
+    
+    def _on_close(self):
+        """writes the last changes, waits for the worker to finish, then closes the window"""
+        self.status_var.set("Saving...")
+        self._watcher.stop()
+        self._closing = True
+        while self._busy or self._pending:
+            if not self._busy:      # the last changes can only be sent once the worker is done with its command
+                self._flush()
+            try:
+                kind, value = self._results.get(timeout=CLOSE_TIMEOUT_S)
+            except queue.Empty:     # a big todoList being rewritten, or a stuck worker : the user decides
+                if messagebox.askretrycancel("Closing", "The tasks are still being written, wait for them ?\n"
+                                                        "(Cancel closes the window, the last changes may be lost)"):
+                    continue
+                break
+            if kind != "error":
+                self._handle_result(kind, value)
+                continue
+            self._busy = False
+            if self._restore_failed_save() and not messagebox.askretrycancel(
+                    "File error", f"The last changes couldn't be saved : {value}\nTry again ?"):
+                break
+        self._commands.put(("close",))
+        self._worker.join(CLOSE_TIMEOUT_S)
+        self.master.destroy()
+    
+    @property
+    def store(self):
+        """the tasks and their indexes (TaskStore)"""
+        return self.todo.store
+    
+    @property
+    def tasks(self):
+        """tasks ordered by id"""
+        return self.store.tasks
+    
+    @property
+    def tasks_by_id(self):
+        return self.store.by_id
+    
+    def _persist(self, record):
+        """
+        saves one mutation : the record is kept and written with the other changes made within SAVE_DELAY_MS
+        (appended to the journal in journal mode, else the whole file is rewritten)
+        """
+        if record["op"] == "put":
+            record = dict(record, task=record["task"].copy())    # copied now, the task can change before the write
+        self._pending.append(record)
+        if self._save_job is None:
+            self._save_job = self.master.after(SAVE_DELAY_MS, self._flush)
+        self.status_var.set("Unsaved changes...")
+    
+    def _flush(self):
+        """sends the pending changes to the worker"""
+        if self._save_job is not None:
+            self.master.after_cancel(self._save_job)
+            self._save_job = None
+        if not self._pending or self._busy:       # sent once the worker is done (see _handle_result)
+            return
+        records, self._pending = self._pending, []
+        self._saving = records
+        # the whole list is only copied (here, the tasks belong to this thread) when the file is rewritten
+        tasks = [task.copy() for task in self.tasks] if self.todo.rewrite_needed() else None
+        self._send(("save", records, tasks))
+        self.status_var.set("Saving...")
     
     def setup_ui(self):
         """configures the main user interface"""
@@ -90,6 +425,7 @@ class TodoListGUI:
                            font=("Arial", 10, "bold"),
                            relief=tk.FLAT, padx=10, pady=8)
         btn_add.pack(fill=tk.X, pady=5, padx=10)
+        self._edit_buttons = [btn_add]
         
         btn_edit = tk.Button(left_frame, text="✏️ Edit task", 
                             command=self.edit_task_window,
@@ -97,6 +433,7 @@ class TodoListGUI:
                             font=("Arial", 10, "bold"),
                             relief=tk.FLAT, padx=10, pady=8)
         btn_edit.pack(fill=tk.X, pady=5, padx=10)
+        self._edit_buttons.append(btn_edit)
         
         btn_toggle = tk.Button(left_frame, text="✓ Toggle status", 
                               command=self.toggle_task_status,
@@ -104,6 +441,7 @@ class TodoListGUI:
                               font=("Arial", 10, "bold"),
                               relief=tk.FLAT, padx=10, pady=8)
         btn_toggle.pack(fill=tk.X, pady=5, padx=10)
+        self._edit_buttons.append(btn_toggle)
         
         btn_delete = tk.Button(left_frame, text="🗑️ Delete task", 
                               command=self.delete_task_window,
@@ -111,6 +449,15 @@ class TodoListGUI:
                               font=("Arial", 10, "bold"),
                               relief=tk.FLAT, padx=10, pady=8)
         btn_delete.pack(fill=tk.X, pady=5, padx=10)
+        self._edit_buttons.append(btn_delete)
+        
+        btn_bulk = tk.Button(left_frame, text="📦 Bulk change", 
+                            command=self.bulk_change_window,
+                            bg="#e67e22", fg="white", 
+                            font=("Arial", 10, "bold"),
+                            relief=tk.FLAT, padx=10, pady=8)
+        btn_bulk.pack(fill=tk.X, pady=5, padx=10)
+        self._edit_buttons.append(btn_bulk)
         
         # display section
         view_label = tk.Label(left_frame, text="Display", 
@@ -183,121 +530,48 @@ class TodoListGUI:
                 font=("Arial", 10), bg="white").pack(side=tk.LEFT, padx=5)
         
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', lambda *args: self.apply_filter_sort())
+        self.search_var.trace('w', lambda *args: self._schedule_search())
         search_entry = tk.Entry(search_frame, textvariable=self.search_var, 
                                font=("Arial", 10), width=40)
         search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
-        # scrollable text area to display tasks
-        self.task_display = scrolledtext.ScrolledText(right_frame, 
-                                                       wrap=tk.WORD,
-                                                       font=("Consolas", 10),
-                                                       bg="white",
-                                                       relief=tk.FLAT,
-                                                       padx=10, pady=10)
-        self.task_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # configure color tags for text
-        for color_name, color_code in self.colors.items():
-            self.task_display.tag_config(color_name, foreground=color_code)
+        # loading / saving state
+        self.status_var = tk.StringVar()
+        tk.Label(right_frame, textvariable=self.status_var, anchor=tk.W,
+                font=("Arial", 9), bg="white", fg="#7f8c8d").pack(fill=tk.X, padx=10)
         
-        self.task_display.tag_config("title", font=("Arial", 11, "bold"))
-        self.task_display.tag_config("urgent", background="#ffcccc")
-        self.task_display.tag_config("done", foreground="#808080", overstrike=True)
+        # scrollable list of tasks, only the visible ones are drawn
+        self.task_display = TaskListView(right_frame, self.colors, bg="white")
+        self.task_display.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # initial display
-        self.refresh_display()
+        # initial display (empty until the worker has read the file)
+        self.apply_filter_sort()
+        self._load()
     
     def _check_deadlines(self):
         """checks deadlines and displays alerts"""
-        task_list_today = []
-        task_list_past = []
-        today = date.today()
-        
-        for task in self.tasks:
-            deadline = task.get("deadline", "")
-            if not task.get("done", False) and deadline:
-                try:
-                    deadline_date = datetime.strptime(deadline, "%d-%m-%Y").date()
-                    if deadline_date == today:
-                        task_list_today.append(task)
-                    elif deadline_date < today:
-                        task_list_past.append(task)
-                except:
-                    pass
+        # range queries on the deadline index (undone tasks only)
+        task_list_past = self.todo.overdue()
+        task_list_today = self.todo.due_today()
         
         if task_list_past or task_list_today:
             msg = ""
             if task_list_past:
                 msg += f"⚠️ {len(task_list_past)} overdue task(s):\n"
                 for t in task_list_past:
-                    msg += f"  - {t['text']}\n"
+                    msg += f"  - {t.text}\n"
                 msg += "\n"
             
             if task_list_today:
                 msg += f"{len(task_list_today)} task(s) due today:\n"
                 for t in task_list_today:
-                    msg += f"  - {t['text']}\n"
+                    msg += f"  - {t.text}\n"
             
             messagebox.showwarning("Deadline reminder", msg)
     
     def display_tasks(self, tasks):
-        """displays tasks in text area"""
-        self.task_display.config(state=tk.NORMAL)
-        self.task_display.delete(1.0, tk.END)
-        
-        if not tasks:
-            self.task_display.insert(tk.END, "No tasks to display.\n", "title")
-        else:
-            for task in tasks:
-                self._display_single_task(task)
-                self.task_display.insert(tk.END, "\n" + "─"*80 + "\n\n")
-        
-        self.task_display.config(state=tk.DISABLED)
-    
-    def _display_single_task(self, task):
-        """displays a single task with formatting"""
-        color = task.get("color", "normal")
-        done = task.get("done", False)
-        
-        # ID and text
-        id_text = f"📌 ID: {task.get('id', 'N/A')} | "
-        self.task_display.insert(tk.END, id_text, color)
-        
-        task_text = f"{task.get('text', '')}\n"
-        if done:
-            self.task_display.insert(tk.END, task_text, ("done", color))
-        else:
-            self.task_display.insert(tk.END, task_text, (color, "title"))
-        
-        # task status
-        status = "✅ Done" if done else "⏳ In progress"
-        self.task_display.insert(tk.END, f"Status: {status}\n", color)
-        
-        # theme
-        if task.get("theme", "") != "default":
-            self.task_display.insert(tk.END, f"📁 Theme: {task.get('theme', '')}\n", color)
-        
-        # creation date
-        self.task_display.insert(tk.END, f"📅 Created on: {task.get('date', '')}\n", color)
-        
-        # deadline
-        if task.get("deadline", ""):
-            today = date.today()
-            try:
-                deadline_date = datetime.strptime(task.get("deadline"), "%d-%m-%Y").date()
-                if deadline_date <= today and not done:
-                    self.task_display.insert(tk.END, f"⚠️ DEADLINE: {task.get('deadline')}\n", 
-                                           ("urgent", color))
-                else:
-                    self.task_display.insert(tk.END, f"⏰ Deadline: {task.get('deadline')}\n", color)
-            except:
-                self.task_display.insert(tk.END, f"⏰ Deadline: {task.get('deadline')}\n", color)
-        
-        # priority
-        if task.get("priority", 0) != 0:
-            priority = task.get("priority", 0)
-            self.task_display.insert(tk.END, f"Priority: {priority}/5\n", color)
+        """displays tasks in the task list"""
+        self.task_display.set_tasks(tasks)
     
     def on_filter_change(self, filter_value):
         """handles filter change and opens selection windows if needed"""
@@ -311,45 +585,59 @@ class TodoListGUI:
             # for done/not done filters
             self.apply_filter_sort()
     
+    def _schedule_search(self):
+        """(re)starts the delay before searching, so the search runs once the user stops typing"""
+        self._cancel_search()
+        self._search_job = self.master.after(SEARCH_DELAY_MS, self.apply_filter_sort)
+    
+    def _cancel_search(self):
+        """cancels the pending search"""
+        if self._search_job is not None:
+            self.master.after_cancel(self._search_job)
+            self._search_job = None
+    
     def apply_filter_sort(self):
         """applies selected filters and sorts"""
-        tasks = list(self.tasks)
-        
-        # text search
-        search_text = self.search_var.get().lower()
-        if search_text:
-            tasks = [t for t in tasks if search_text in t.get("text", "").lower()]
-        
-        # filtering
+        self._cancel_search()
+        self.display_tasks(self._visible_tasks())
+    
+    def _visible_tasks(self):
+        """tasks matching the search, filters and sort (the last results are cached until a task changes)"""
+        search_text = self.search_var.get()
         filter_mode = self.filter_var.get()
-        tasks = self._apply_filter(tasks, filter_mode)
-        
-        # sorting
+        criteria = self._filter_criteria(filter_mode)
         sort_mode = self.sort_var.get()
-        if sort_mode != "none":
-            tasks = self._sort_tasks(tasks, sort_mode)
-        
-        self.display_tasks(tasks)
-    
-    def _apply_filter(self, tasks, mode):
-        """applies a filter to tasks"""
-        if mode == "all":
-            return tasks
-        elif mode == "done":
-            return [t for t in tasks if t.get("done", False)]
-        elif mode == "not_done":
-            return [t for t in tasks if not t.get("done", False)]
-        elif mode == "category" and "category" in self.active_filter_params:
-            return [t for t in tasks if t.get("theme") == self.active_filter_params["category"]]
-        elif mode == "color" and "color" in self.active_filter_params:
-            return [t for t in tasks if t.get("color") == self.active_filter_params["color"]]
-        elif mode == "priority" and "priority" in self.active_filter_params:
-            return [t for t in tasks if t.get("priority") == self.active_filter_params["priority"]]
+        key = (search_text, filter_mode, tuple(sorted(criteria.items())), sort_mode, self.store.version)
+        
+        tasks = self._result_cache.get(key)
+        if tasks is not None:
+            self._result_cache.move_to_end(key)
+        else:
+            if search_text.strip():
+                # filtering and search of the typed parts of words (trigram index), ranked : exact matches first
+                tasks = self.store.find(search_text, SEARCH_MAX_ERRORS, **criteria)
+            else:
+                tasks = self.store.query(**criteria)     # empty search box : the indexes of the filters only
+            
+            # sorting
+            if sort_mode != "none":
+                tasks = self.todo.sort_tasks(tasks, sort_mode, reverse=sort_mode == "priority")     # highest priority first
+            
+            # results of an older version can't be asked again
+            if self._result_cache and next(reversed(self._result_cache))[-1] != self.store.version:
+                self._result_cache.clear()
+            self._result_cache[key] = tasks
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
         return tasks
     
+    def _filter_criteria(self, mode):
+        """criteria of the store query (field: value) for a filter mode, {} = every task"""
+        return self.todo.filter_criteria(mode, **self.active_filter_params) or {}
+    
     def filter_by_category_window(self):
         """opens a window to filter by category"""
-        categories = list(set(t.get("theme", "") for t in self.tasks if t.get("theme")))
+        categories = self.store.values("theme")
         if not categories:
             messagebox.showinfo("Info", "No categories available")
             self.filter_var.set("all")  # if cancelled, go back to "all" filter
@@ -364,7 +652,7 @@ class TodoListGUI:
     
     def filter_by_color_window(self):
         """opens a window to filter by color"""
-        colors = list(set(t.get("color", "") for t in self.tasks if t.get("color")))
+        colors = self.store.values("color")
         if not colors:
             messagebox.showinfo("Info", "No colors available")
             self.filter_var.set("all")
@@ -386,42 +674,9 @@ class TodoListGUI:
         else:
             self.filter_var.set("all")
     
-    def _sort_tasks(self, tasks, mode):
-        """sorts tasks according to specified mode"""
-        if mode == "date_added":
-            return sorted(tasks, key=lambda t: self._parse_date(t.get("date", "")))
-        elif mode == "deadline":
-            def key_deadline(t):
-                s = (t.get("deadline", "") or "").strip()
-                if not s:
-                    return (0, datetime.min)
-                try:
-                    d = datetime.strptime(s, "%d-%m-%Y").date()
-                    return (1, d)
-                except:
-                    return (0, datetime.min)
-            return sorted(tasks, key=key_deadline)
-        elif mode == "alphabetically":
-            return sorted(tasks, key=lambda t: t.get("text", "").lower())
-        elif mode == "statut":
-            done = [t for t in tasks if t.get("done", False)]
-            not_done = [t for t in tasks if not t.get("done", False)]
-            return done + not_done
-        elif mode == "priority":
-            return sorted(tasks, key=lambda t: t.get("priority", 0), reverse=True)
-        return tasks
-    
-    def _parse_date(self, date_str):
-        """parses a date in dd-mm-yyyy format"""
-        try:
-            return datetime.strptime(date_str, "%d-%m-%Y")
-        except:
-            return datetime.max
-    
     def refresh_display(self):
-        """refreshes the display"""
-        self._load()
-        self.apply_filter_sort()
+        """reads the changes of the file now (the file is also watched : they usually are already shown)"""
+        self._file_changed.set()
     
     def add_task_window(self):
         """window to add a task"""
@@ -494,7 +749,7 @@ class TodoListGUI:
             
             theme = fields['theme'].get().strip() or "default"
             deadline_str = fields['deadline'].get().strip()
-            deadline = ""
+            deadline = None
             
             if deadline_str:
                 try:
@@ -502,7 +757,7 @@ class TodoListGUI:
                     if deadline_date < date.today():
                         messagebox.showerror("Error", "Deadline cannot be in the past !")
                         return
-                    deadline = deadline_str
+                    deadline = deadline_date
                 except ValueError:
                     messagebox.showerror("Error", "Invalid date format (dd-mm-yyyy)")
                     return
@@ -523,7 +778,7 @@ class TodoListGUI:
                           priority=priority, color=color, done=done)
             
             window.destroy()
-            self.refresh_display()
+            self.apply_filter_sort()
             messagebox.showinfo("Success", "Task added successfully !")
         
         tk.Button(btn_frame, text="Add", command=save_task,
@@ -536,33 +791,12 @@ class TodoListGUI:
     
     def _add_task(self, text, theme, deadline, priority, color, done):
         """adds a task to the list"""
-        # find a unique ID
-        id_count = 1
-        for task in self.tasks:
-            if task.get("id") == id_count:
-                id_count += 1
-        
-        new_task = {
-            "id": id_count,
-            "done": done,
-            "theme": theme,
-            "text": text,
-            "date": date.today().strftime("%d-%m-%Y"),
-            "deadline": deadline,
-            "priority": priority,
-            "color": color,
-        }
+        new_task = Task(self.store.new_id(), text, done=done, theme=theme, date=date.today(),
+                        deadline=deadline, priority=priority, color=color)
         
         # insert task at correct position in json
-        for idx, task in enumerate(self.tasks):
-            if new_task["id"] < task["id"]:
-                self.tasks.insert(idx, new_task)
-                break
-        else:
-            self.tasks.append(new_task)
-        
-        self._reindex()
-        self._save()
+        self.store.add(new_task)
+        self._persist({"op": "put", "task": new_task, "new": True})
     
     def edit_task_window(self):
         """window to edit a task"""
@@ -587,7 +821,7 @@ class TodoListGUI:
         tk.Label(window, text="Task name:", bg="#f0f0f0", 
                 font=("Arial", 10, "bold")).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
         fields['text'] = tk.Entry(window, width=40, font=("Arial", 10))
-        fields['text'].insert(0, task.get("text", ""))
+        fields['text'].insert(0, task.text)
         fields['text'].grid(row=row, column=1, padx=10, pady=5)
         
         row += 1
@@ -595,7 +829,7 @@ class TodoListGUI:
         tk.Label(window, text="Thème:", bg="#f0f0f0", 
                 font=("Arial", 10)).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
         fields['theme'] = tk.Entry(window, width=40, font=("Arial", 10))
-        fields['theme'].insert(0, task.get("theme", ""))
+        fields['theme'].insert(0, task.theme)
         fields['theme'].grid(row=row, column=1, padx=10, pady=5)
         
         row += 1
@@ -603,7 +837,7 @@ class TodoListGUI:
         tk.Label(window, text="Deadline (jj-mm-aaaa):", bg="#f0f0f0", 
                 font=("Arial", 10)).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
         fields['deadline'] = tk.Entry(window, width=40, font=("Arial", 10))
-        fields['deadline'].insert(0, task.get("deadline", ""))
+        fields['deadline'].insert(0, format_date(task.deadline))
         fields['deadline'].grid(row=row, column=1, padx=10, pady=5)
         
         row += 1
@@ -612,7 +846,7 @@ class TodoListGUI:
                 font=("Arial", 10)).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
         fields['priority'] = tk.Spinbox(window, from_=1, to=5, width=38, font=("Arial", 10))
         fields['priority'].delete(0, tk.END)
-        fields['priority'].insert(0, str(task.get("priority", 0)))
+        fields['priority'].insert(0, str(task.priority))
         fields['priority'].grid(row=row, column=1, padx=10, pady=5)
         
         row += 1
@@ -621,12 +855,12 @@ class TodoListGUI:
                 font=("Arial", 10)).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
         fields['color'] = ttk.Combobox(window, width=37, font=("Arial", 10),
                                        values=list(self.colors.keys()))
-        fields['color'].set(task.get("color", "normal"))
+        fields['color'].set(task.color)
         fields['color'].grid(row=row, column=1, padx=10, pady=5)
         
         row += 1
         # statut
-        fields['done'] = tk.BooleanVar(value=task.get("done", False))
+        fields['done'] = tk.BooleanVar(value=task.done)
         tk.Checkbutton(window, text="Mark as done", variable=fields['done'],
                       bg="#f0f0f0", font=("Arial", 10)).grid(row=row, column=0, 
                                                              columnspan=2, pady=10)
@@ -637,18 +871,25 @@ class TodoListGUI:
         btn_frame.grid(row=row, column=0, columnspan=2, pady=20)
         
         def save_changes():
+            current = self.tasks_by_id.get(task_id)     # the file may have been read again while the window was open
+            if current is None:
+                messagebox.showerror("Erreur", "Tâche introuvable!")
+                window.destroy()
+                self.apply_filter_sort()
+                return
+            changes = {}    # applied only once every field is valid
             text = fields['text'].get().strip()
             if text:
                 text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
-                task["text"] = text
+                changes["text"] = text
             
             theme = fields['theme'].get().strip()
             if theme:
-                task["theme"] = theme
+                changes["theme"] = theme
             
             # deadline handling
             deadline_str = fields['deadline'].get().strip()
-            original_deadline = task.get("deadline", "")
+            original_deadline = format_date(current.deadline)
             
             # if deadline changed, verify it's not in the past
             if deadline_str != original_deadline:
@@ -658,12 +899,12 @@ class TodoListGUI:
                         if deadline_date < date.today():
                             messagebox.showerror("Error", "New deadline cannot be in the past")
                             return
-                        task["deadline"] = deadline_str
+                        changes["deadline"] = deadline_date
                     except ValueError:
                         messagebox.showerror("Error", "Invalid date format (dd-mm-yyyy)")
                         return
                 else:
-                    task["deadline"] = ""
+                    changes["deadline"] = None
             # if deadline hasn't changed, keep it (even if it's in the past)
             
             try:
@@ -671,21 +912,20 @@ class TodoListGUI:
                 if priority < 1 or priority > 5:
                     messagebox.showerror("Error", "Priority must be between 1 and 5")
                     return
-                task["priority"] = priority
+                changes["priority"] = priority
             except ValueError:
                 messagebox.showerror("Error", "Priority must be a valid number")
                 return
             
             color = fields['color'].get()
             if color:
-                task["color"] = color
+                changes["color"] = color
             
-            task["done"] = fields['done'].get()
+            changes["done"] = fields['done'].get()
             
-            self._reindex()
-            self._save()
+            self._persist({"op": "put", "task": self.store.update(task_id, changes)})
             window.destroy()
-            self.refresh_display()
+            self.apply_filter_sort()
             messagebox.showinfo("Success", "Task updated successfully!")
         
         tk.Button(btn_frame, text="Save", command=save_changes,
@@ -707,12 +947,11 @@ class TodoListGUI:
             messagebox.showerror("Erreur", "Tâche introuvable!")
             return
         
-        task["done"] = not task.get("done", False)
-        self._reindex()
-        self._save()
-        self.refresh_display()
+        self.store.update(task_id, {"done": not task.done})
+        self._persist({"op": "put", "task": task})
+        self.apply_filter_sort()
         
-        status = "done" if task["done"] else "not done"
+        status = "done" if task.done else "not done"
         messagebox.showinfo("Success", f"Task marked as {status}")
     
     def delete_task_window(self):
@@ -727,14 +966,117 @@ class TodoListGUI:
             return
         
         confirm = messagebox.askyesno("Confirmation", 
-                                      f"Are you sure you want to delete this task:\n\n'{task.get('text', '')}'?")
+                                      f"Are you sure you want to delete this task:\n\n'{task.text}'?")
         if confirm:
-            self.tasks = [t for t in self.tasks if t["id"] != task_id]
-            self._reindex()
-            self._save()
-            self.refresh_display()
+            if task_id not in self.tasks_by_id:      # deleted by another program while the question was asked
+                messagebox.showerror("Erreur", "Tâche introuvable!")
+                self.apply_filter_sort()
+                return
+            self.store.remove(task_id)
+            self._persist({"op": "del", "id": task_id})
+            self.apply_filter_sort()
             messagebox.showinfo("Success", "Task deleted successfully!")
     
+    def bulk_change_window(self):
+        """window to mark as done, recolor or delete every task matching a filter"""
+        window = tk.Toplevel(self.master)
+        window.title("Bulk change")
+        window.geometry("500x520")
+        window.configure(bg="#f0f0f0")
+        
+        # filters, all optional
+        fields = {}
+        filter_rows = [
+            ("theme", "Thème:", ttk.Combobox, {"values": [""] + self.store.values("theme")}),
+            ("color", "Couleur:", ttk.Combobox, {"values": [""] + self.store.values("color")}),
+            ("priority", "Priority (0-5):", ttk.Combobox, {"values": [""] + [str(i) for i in range(6)]}),
+            ("status", "Status:", ttk.Combobox, {"values": ["any", "done", "not done"]}),
+            ("deadline_from", "Deadline from (jj-mm-aaaa):", tk.Entry, {}),
+            ("deadline_to", "Deadline until (jj-mm-aaaa):", tk.Entry, {}),
+            ("text", "Words:", tk.Entry, {}),
+        ]
+        for row, (name, label, widget, options) in enumerate(filter_rows):
+            tk.Label(window, text=label, bg="#f0f0f0", 
+                    font=("Arial", 10)).grid(row=row, column=0, sticky=tk.W, padx=10, pady=5)
+            fields[name] = widget(window, width=30, font=("Arial", 10), **options)
+            fields[name].grid(row=row, column=1, padx=10, pady=5)
+        fields['status'].set("any")
+        
+        # action
+        row = len(filter_rows)
+        action_frame = tk.LabelFrame(window, text="Action", bg="#f0f0f0", font=("Arial", 10, "bold"))
+        action_frame.grid(row=row, column=0, columnspan=2, sticky=tk.EW, padx=10, pady=10)
+        action_var = tk.StringVar(value="done")
+        for text, value in [("Mark as done", "done"), ("Mark as not done", "not_done"),
+                            ("Change color to:", "color"), ("Delete", "delete")]:
+            tk.Radiobutton(action_frame, text=text, variable=action_var, value=value,
+                          bg="#f0f0f0", font=("Arial", 9)).pack(anchor=tk.W, padx=5)
+        new_color = ttk.Combobox(action_frame, width=20, font=("Arial", 10), values=list(self.colors.keys()))
+        new_color.set("normal")
+        new_color.pack(anchor=tk.W, padx=25, pady=(0, 5))
+        
+        def apply_change():
+            filters = {}
+            for name in ("theme", "color", "text"):
+                value = fields[name].get().strip()
+                if value:
+                    filters[name] = value
+            if fields['priority'].get().strip():
+                try:
+                    filters["priority"] = int(fields['priority'].get())
+                except ValueError:
+                    messagebox.showerror("Error", "Priority must be a valid number")
+                    return
+                if not 0 <= filters["priority"] <= 5:
+                    messagebox.showerror("Error", "Priority must be between 0 and 5!")
+                    return
+            if fields['status'].get() != "any":
+                filters["done"] = fields['status'].get() == "done"
+            for name in ("deadline_from", "deadline_to"):
+                value = fields[name].get().strip()
+                if value:
+                    filters[name] = parse_date(value)
+                    if filters[name] is None:
+                        messagebox.showerror("Error", "Invalid date format (dd-mm-yyyy)")
+                        return
+            
+            tasks = self.store.select(**filters)
+            if not tasks:
+                messagebox.showinfo("Bulk change", "No task matches these filters")
+                return
+            action = action_var.get()
+            if not messagebox.askyesno("Confirmation", f"Apply '{action}' to {len(tasks)} task(s)?"):
+                return
+            
+            # the records are written together by the next save of the worker
+            changed = 0
+            field, value = ("color", new_color.get() or "normal") if action == "color" else ("done", action == "done")
+            for task_id in [task.id for task in tasks]:
+                # the file may have been read again during the question : current tasks, deleted ones skipped
+                task = self.tasks_by_id.get(task_id)
+                if task is None:
+                    continue
+                if action == "delete":
+                    self.store.remove(task_id)
+                    self._persist({"op": "del", "id": task_id})
+                    changed += 1
+                elif getattr(task, field) != value:
+                    self._persist({"op": "put", "task": self.store.update(task_id, {field: value})})
+                    changed += 1
+            
+            window.destroy()
+            self.apply_filter_sort()
+            messagebox.showinfo("Success", f"{changed} task(s) changed")
+        
+        btn_frame = tk.Frame(window, bg="#f0f0f0")
+        btn_frame.grid(row=row + 1, column=0, columnspan=2, pady=10)
+        tk.Button(btn_frame, text="Apply", command=apply_change,
+                 bg="#e67e22", fg="white", font=("Arial", 10, "bold"),
+                 padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", command=window.destroy,
+                 bg="#e74c3c", fg="white", font=("Arial", 10, "bold"),
+                 padx=20, pady=5).pack(side=tk.LEFT, padx=5)
+    
     def _select_task_id(self, title):
         """displays a window to select a task"""
         if not self.tasks:
@@ -761,16 +1103,18 @@ class TodoListGUI:
         listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=listbox.yview)
         
+        shown_ids = []      # ids of the rows : the tasks can change while the window is open
         for task in self.tasks:
-            status = "✅" if task.get("done", False) else "⏳"
-            listbox.insert(tk.END, f"ID {task['id']}: {status} {task.get('text', '')}")
+            status = "✅" if task.done else "⏳"
+            listbox.insert(tk.END, f"ID {task.id}: {status} {task.text}")
+            shown_ids.append(task.id)
         
         selected_id = [None]
         
         def on_select():
             selection = listbox.curselection()
             if selection:
-                selected_id[0] = self.tasks[selection[0]]["id"]
+                selected_id[0] = shown_ids[selection[0]]
                 window.destroy()
         
         btn_frame = tk.Frame(window, bg="#f0f0f0")
@@ -864,7 +1208,7 @@ class TodoListGUI:
 
 def main():
     root = tk.Tk()
-    app = TodoListGUI(root)
+    app = TodoListGUI(root, journal=True, backups=2)
     root.mainloop()
 
 
@@ -1,12 +1,15 @@
 #import csv
-import json
-import os
+import sys
 from datetime import date
 from datetime import datetime
 
 from colorama import Fore, Style, init
 
+import todolist
+from todolist import format_date, parse_date, server
+
 init(autoreset=True)
+TASKS_PER_PAGE = 20     # tasks printed at once in read mode
 colors = {
     "red": Fore.RED,
     "green": Fore.GREEN,
@@ -17,114 +20,53 @@ colors = {
     "black": Fore.BLACK
 }
 
-class TodoList:
-    def __init__(self, file_path: str = "ToDoList.json"):
-        self.file_path = file_path
-        self.tasks = []
-        self.tasks_by_id = {}
-        self._load()
 
-    def _reindex(self):
-        """
-        (re)build self.tasks_by_id
-        """
-        self.tasks_by_id = {t["id"]: t for t in self.tasks}
+class TodoList(todolist.TodoList):
+    """
+    The todoList of the command line : the engine of the todolist package, which prints what it does
+    """
 
     def _load(self):
-        if not os.path.exists(self.file_path):
-            self.tasks = []
-            self._reindex()
-            return
-        try:
-            with open(self.file_path, "r", encoding="utf-8") as f:      # can create many todoLists as we want
-                data = json.load(f)     # dict
-
-            # data = dict = {tasks: [{task1}, {task2}]}
-            self.tasks = data.get("tasks", []) if isinstance(data, dict) else [] # if dict, get the value (the tasks with metadata) of "tasks" key 
-            # self.tasks = lst = [{task1}, {task2}]
-
-            #self.tasks_by_id = {task["id"]: task for task in data["tasks"]}
-            self._reindex()
-        except (json.JSONDecodeError, OSError):         # decode or read error
-            self.tasks = []
-            self.tasks_by_id = {}
-
-
-    
-    def _save(self):
-        """Save and close the todoList"""
-
-        data = {"tasks": self.tasks}
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)    # false for emojis (maybe), 4 space for indentation
+        super()._load()
+        for error in self.read_errors:
+            print(Fore.RED + f"{error}, trying an older version" + Style.RESET_ALL)
+        if self.recovered_from is not None:
+            print(Fore.YELLOW + f"The todoList has been recovered from {self.recovered_from}" + Style.RESET_ALL)
+        if self.moved_aside is not None:
+            print(Fore.RED + f"No version of the todoList could be read, the damaged file was moved to {self.moved_aside}" + Style.RESET_ALL)
 
     def add_task(self, *, text: str, theme: str = "default", date= date.today(),
                  deadline, priority: int = 0,
                  color: str = "normal", done: bool = False):
-        if deadline != "":
-            deadline = deadline.strftime("%d-%m-%Y")
-        # checking that the id doesn't already exist in the JSON :
-        id_count = 1
-        for task in self.tasks:
-            id = int(task.get("id"))
-            if id==id_count:
-                id_count+=1
-        new_task = {
-            "id" : id_count, # unique id at a given time
-            "done": done,
-            "theme": theme,
-            "text": text,
-            "date": date.strftime("%d-%m-%Y"),
-            "deadline": deadline,
-            "priority": priority,
-            "color": color,
-        }
-        # inserting at the correct index in the JSON (id)
-        for idx, task in enumerate(self.tasks):
-            if new_task["id"] < task["id"]:
-                self.tasks.insert(idx, new_task)
-                break
-        else:
-            self.tasks.append(new_task)
-        self._reindex()
-        self._save()
+        new_task = super().add_task(text=text, theme=theme, date=date, deadline=deadline,
+                                    priority=priority, color=color, done=done)
         # Printing
         print(Fore.GREEN + "\nTask successfully added to the JSON file as:")
         self.print_task(new_task)
+        return new_task
 
     def _edit_task(self, done, task, text ="", theme = "",
                  deadline= "", priority="",
                  color = ""):
-        if (deadline != ""):
-            deadline = deadline.strftime("%d-%m-%Y")
+        changes = {}
         if (done != ""):
-            task.update({"done": done})
+            changes["done"] = done
         if (theme != ""):
-            task.update({"theme": theme})
+            changes["theme"] = theme
         if (text != ""):
-            task.update({"text": text})
+            changes["text"] = text
         if (deadline != ""):
-            task.update({"deadline": deadline})
+            changes["deadline"] = deadline
         if (priority != ""):
-            task.update({"priority": priority})
+            changes["priority"] = priority
         if (color != ""):
-            task.update({"color": color})
-        self._reindex()
-        self._save()
+            changes["color"] = color
+        self.update_task(task.id, changes)
 
         # Printing
         print(Fore.GREEN + "Task successfully edited to the JSON file as:\n")
         self.print_task(task)
 
-    def list_tasks(self):
-        return list(self.tasks)
-
-    def delete_task(self, task_id):
-        # keep all the task exept the selected one
-        self.tasks = [task for task in self.tasks if task["id"] != task_id]
-        self._reindex()
-        self._save()
-
     def _printSumUpTask(self, task_id: int =None):
         '''This function print the name and id of each task in the ToDoList'''
         task_id_list = []
@@ -134,152 +76,53 @@ class TodoList:
             if (task_id == None):
                 print("----Tasks sum up----\n")
                 for t in self.tasks:
-                    color_name = t.get("color", "").lower()
+                    color_name = t.color.lower()
                     color_code = colors.get(color_name, "")
-                    task_id_list.append(str(t.get("id", "")))
-                    print(color_code + f'Id : {t.get("id","Error")}\nTask : {t.get("text","")}\nDone : {t.get("done","")}\n' + Style.RESET_ALL)
+                    task_id_list.append(str(t.id))
+                    print(color_code + f'Id : {t.id}\nTask : {t.text}\nDone : {t.done}\n' + Style.RESET_ALL)
             else:
-                for t in self.tasks:
-                    if(t.get("id", "error") == task_id):
-                        color_name = t.get("color", "").lower()
-                        color_code = colors.get(color_name, "")
-                        task_id_list.append(str(t.get("id", "")))
-                        print(color_code + f'Id : {t.get("id","Error")}\nTask : {t.get("text","")}\nDone : {t.get("done","")}\n' + Style.RESET_ALL)
-                        # return task_id_list
-                print(f"This task id does not figures in the ToDoList : {task_id}")
+                t = self.tasks_by_id.get(task_id)
+                if t is not None:
+                    color_name = t.color.lower()
+                    color_code = colors.get(color_name, "")
+                    task_id_list.append(str(t.id))
+                    print(color_code + f'Id : {t.id}\nTask : {t.text}\nDone : {t.done}\n' + Style.RESET_ALL)
+                else:
+                    print(f"This task id does not figures in the ToDoList : {task_id}")
         return task_id_list
 
     def print_task(self, task):
         """print a task with color formatting"""
-        color_name = task.get("color", "").lower()
+        color_name = task.color.lower()
         color_code = colors.get(color_name, "")
         print()
-        print(color_code + f'Id : {task.get("id","Error")}\nTask : {task.get("text","")}\nDone : {task.get("done", False)}'+ Style.RESET_ALL)
-        if (task.get("theme","") != "default"):
-            print(color_code + f'Theme : {task.get("theme","")}' + Style.RESET_ALL)
-        print(color_code + f'Task created on {task.get("date","")}'  + Style.RESET_ALL)
-        if (task.get("deadline","") != ""):
+        print(color_code + f'Id : {task.id}\nTask : {task.text}\nDone : {task.done}'+ Style.RESET_ALL)
+        if (task.theme != "default"):
+            print(color_code + f'Theme : {task.theme}' + Style.RESET_ALL)
+        print(color_code + f'Task created on {format_date(task.date)}'  + Style.RESET_ALL)
+        if (task.deadline is not None):
             today = date.today()
-            date_obj = datetime.strptime(task.get("deadline"), "%d-%m-%Y").date()
-            if date_obj <= today and task.get("done") is False:
-                print("\033[41m" + color_code + f'For the : {task.get("deadline","")}' + "\033[0m" + Style.RESET_ALL)
+            if task.deadline <= today and task.done is False:
+                print("\033[41m" + color_code + f'For the : {format_date(task.deadline)}' + "\033[0m" + Style.RESET_ALL)
             else:
-                print(color_code + f'For the : {task.get("deadline","")}' + Style.RESET_ALL)
-        if (task.get("priority","") != 0):
-            print(color_code + f'Priority level/5 : {task.get("priority","")}' + Style.RESET_ALL)
+                print(color_code + f'For the : {format_date(task.deadline)}' + Style.RESET_ALL)
+        if (task.priority != 0):
+            print(color_code + f'Priority level/5 : {task.priority}' + Style.RESET_ALL)
         print()
 
-    def sort_tasks(self, tasks, mode):
-        """
-        by date (addition/deadline) (most recent at the bottom/closest deadline at the bottom)
-        by status
-        by alphabetical order
-        priority
-        """
-        if not isinstance(tasks, list):
-            return []
-        if mode == "date_added":
-            def parse_date(t):
-                d = t.get("date", "")
-                try:
-                    return datetime.strptime(d, "%d-%m-%Y")
-                except Exception:
-                    return datetime.max
-            return sorted(tasks, key=parse_date)
-        elif mode == "priority":
-            def parse_priority(t):
-                p = t.get("priority", "")
-                return p
-            return sorted(tasks, key=parse_priority)
-        elif mode == "alphabetically":
-            def parse_tasks(t):
-                return t.get("text", "").lower()
-            return sorted(tasks, key=parse_tasks)
-        elif mode == "deadline":
-            def key_deadline(t):
-                s = (t.get("deadline", "") or "").strip()
-                if not s:
-                    return (0, datetime.min)
-                try:
-                    d = datetime.strptime(s, "%d-%m-%Y").date()
-                except Exception:
-                    return (0, datetime.min)
-                return (1, d)
-            return sorted(tasks, key=key_deadline)
-        elif mode == "statut":
-            done_tasks = []
-            not_done_tasks = []
-            for t in tasks:
-                if t.get("done", False):
-                    done_tasks.append(t)
-                else:
-                    not_done_tasks.append(t)
-            return done_tasks + not_done_tasks
-        return []
-
-    def filter_tasks(self, tasks, mode, category=None, color=None, priority=None):
-        """
-        filter by 
-            status
-            category
-            color
-            priority
-        """
-        if not isinstance(tasks, list):
-            return []
-        lst = []
-        match mode:
-            case "done":
-                for task in tasks:
-                    status = task.get("done", "")
-                    if status:
-                        lst.append(task)
-                return lst
-            case "not_done":
-                for task in tasks:
-                    status = task.get("done", "")
-                    if not status:
-                        lst.append(task)
-                return lst
-            case "category":
-                for task in tasks:
-                    if task.get("theme", "") == category:
-                        lst.append(task)
-                return lst
-            case "color":
-                for task in tasks:
-                    if task.get("color", "") == color:
-                        lst.append(task)
-                return lst
-            case "priority":
-                for task in tasks:
-                    if task.get("priority", "") == priority:
-                        lst.append(task)
-                return lst
-        return lst
-
     def _checkDeadlines(self):
-        task_list_today = []
-        task_list_past = []
-        today =  date.today()
-        for task in self.tasks:
-            deadline = task.get("deadline", "")
-            if (task.get("done", "") != True):
-                if (deadline != ""):
-                    deadline_date = datetime.strptime(deadline, "%d-%m-%Y").date()
-                    if (deadline_date == today):
-                        task_list_today.append(task)
-                    elif (deadline_date < today):
-                        task_list_past.append(task)
+        # range queries on the deadline index : only the tasks to print are read
+        task_list_past = self.overdue()
+        task_list_today = self.due_today()
         if (task_list_past != []):
             print(Fore.RED + f"You have {len(task_list_past)} undone task(s) planned past the deadline :\n" + Style.RESET_ALL)
             for task in task_list_past:
-                self._printSumUpTask(task["id"])
+                self._printSumUpTask(task.id)
                 print()
         if (task_list_today != []):
             print(Fore.RED + f"You have {len(task_list_today)} undone task(s) planned for today :\n" + Style.RESET_ALL)
             for task in task_list_today:
-                self._printSumUpTask(task["id"])
+                self._printSumUpTask(task.id)
                 print()
         
 
@@ -364,10 +207,97 @@ def checkdate(message):
             print("Date non valide (jj-mm-yyyy)")
 
 
+def askDate(message):
+    '''This fonction asks a date dd-mm-yyyy (past dates allowed), None if nothing is entered
+    Parameter : str[] message
+    return : date or None '''
+    while True:
+        date_str = input(message).strip()
+        if date_str == "":
+            return None
+        date_obj = parse_date(date_str)
+        if date_obj is not None:
+            return date_obj
+        print("Date non valide (jj-mm-yyyy)")
+
+
+def printPages(todo, next_page):
+    '''This function prints the tasks page by page, the next page is only read when the user asks for it
+    Parameters : TodoList todo, function next_page(cursor) returning (tasks of the page, cursor of the next page or None),
+    the first page is next_page(None)
+    return : None'''
+    page, cursor = next_page(None)
+    if not page:
+        print("No task")
+        return
+    while True:
+        for t in page:
+            todo.print_task(t)
+        if cursor is None:
+            return
+        more = securedInputString("Next page : press enter, to stop : type Q\n>>> ", ["q", "Q"], True)
+        if more.lower() == "q":
+            return
+        page, cursor = next_page(cursor)
+
+
+def slicePages(tasks):
+    '''next_page of printPages for tasks already all in a list : the pages are slices, the cursor is the start of the page'''
+    def next_page(start):
+        start = start or 0
+        end = start + TASKS_PER_PAGE
+        return tasks[start:end], (end if end < len(tasks) else None)
+    return next_page
+
+
+def askFilters(todo):
+    '''This fonction asks the filters of a bulk change, every filter is optional (Enter = any value)
+    Parameter : TodoList todo
+    return : dict of the filters given to TodoList.bulk_update / bulk_delete '''
+    filters = {}
+    print("Select the tasks (press enter to skip a filter)")
+    theme = input(f"Category ({', '.join(map(str, todo.store.values('theme')))}) : ").strip()
+    if theme != "":
+        filters["theme"] = theme
+    color = input(f"Color ({', '.join(map(str, todo.store.values('color')))}) : ").strip()
+    if color != "":
+        filters["color"] = color
+    priority_val = securedInputInt("Priority : ", 0, 5)
+    if priority_val != "":
+        filters["priority"] = priority_val
+    done_in = securedInputString("Done ? (y/n) : ", ["y", "n", "Y", "N"], True).lower()
+    if done_in != "":
+        filters["done"] = done_in == "y"
+    deadline_from = askDate("Deadline from : ")
+    if deadline_from is not None:
+        filters["deadline_from"] = deadline_from
+    deadline_to = askDate("Deadline until : ")
+    if deadline_to is not None:
+        filters["deadline_to"] = deadline_to
+    words = input("Words in the task : ").strip()
+    if words != "":
+        filters["text"] = words
+    return filters
+
+
 def main():
-    todo = TodoList("ToDoList.json")
+    if len(sys.argv) == 4 and sys.argv[1] == "--convert":
+        # python ToDo-List.py --convert ToDoList.json ToDoList.jsonl
+        count = TodoList(sys.argv[2]).export(sys.argv[3])
+        print(Fore.GREEN + f"{count} task(s) written to {sys.argv[3]}")
+        return
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--serve":
+        # python ToDo-List.py --serve [port] : the HTTP/JSON API of todolist/server.py
+        port = int(sys.argv[2]) if len(sys.argv) == 3 else server.SERVER_PORT
+        print(Fore.GREEN + f"Serving ToDoList.json on http://{server.SERVER_HOST}:{port}/tasks (Ctrl+C to stop)")
+        server.serve("ToDoList.json", port=port, journal=True, backups=2)
+        return
+    todo = TodoList("ToDoList.json", journal=True, backups=2)
     todo._checkDeadlines()
     while True:
+        # another program (the GUI, another terminal) may have changed the file meanwhile : a few stats, no parsing
+        if todo.refresh():
+            print(Fore.YELLOW + "The todoList was changed by another program, it has been read again" + Style.RESET_ALL)
         #print("\033[2J\033[H", end="")
         print("------------------------")
         mode = securedInputString("To open the list: \nIn read mode, type L \nIn edition mode: type E\nIn delete mode: type S\nTo exit: type Q\n>>> ",['e','l', 's', 'q', 'E', 'L', 'S', 'Q'],False)
@@ -375,7 +305,7 @@ def main():
         match mode.lower():
             case 'e': #edit mode
                 print("------------------------")
-                mode = securedInputString("Add a task : type A\nEdit a task content : type E\nToggle a task status : type M \nGo back to previous menu : type Q\n>>> ",['a', 'e', 'm', 'q', 'A', 'E', 'M', 'Q'],False)
+                mode = securedInputString("Add a task : type A\nEdit a task content : type E\nToggle a task status : type M \nChange several tasks at once : type B\nGo back to previous menu : type Q\n>>> ",['a', 'e', 'm', 'b', 'q', 'A', 'E', 'M', 'B', 'Q'],False)
                 print("------------------------\n")
                 match mode.lower():
                     case 'a':
@@ -426,7 +356,7 @@ def main():
                             print("\033[2J\033[H", end="")
                             if selected_id != "":
                                 for t in todo.tasks:
-                                    if (int(t.get("id", "")) == selected_id):
+                                    if (t.id == selected_id):
                                         todo.print_task(t)
                                         print("\nTo not modify the champ, just press enter\n")
                                         text = securedInputString("Task name : ", can_be_empty=True)      # input("Texte de la tache : ").strip()
@@ -436,7 +366,7 @@ def main():
                                         deadline = checkdate("Deadline : ")    #datetime.strptime(deadlinetmp, "%d-%m-%Y")
                                         priority_val = securedInputInt("Priorité : ", 0, 5)
                                         if priority_val =="":
-                                            priority_val = t.get("priority", "")
+                                            priority_val = t.priority
                                         color = (input("Color : ").strip() or "")
                                         if color.lower() not in colors and color.lower() != "":
                                             print(f"Color '{color}' unknown, use of 'normal' instead.")
@@ -475,9 +405,9 @@ def main():
                             print("\033[2J\033[H", end="")
                             if selected_id != "":
                                 for t in todo.tasks:
-                                    if (int(t.get("id", "")) == selected_id):
+                                    if (t.id == selected_id):
                                         print("\033[2J\033[H", end="")
-                                        if(t.get("done", "")==True):
+                                        if(t.done==True):
                                             todo._edit_task(task=t,done=False)
                                         else:
                                             todo._edit_task(task=t,done=True)
@@ -485,6 +415,29 @@ def main():
                                 print(Fore.RED + "Operation aborted" )
                         else:
                             print("Operation aborted")
+                    case 'b': # bulk change, by filter
+                        print("\033[2J\033[H", end="")
+                        filters = askFilters(todo)
+                        count = len(todo.store.select(**filters))
+                        print(f"\n{count} task(s) selected")
+                        if count == 0:
+                            continue
+                        action = securedInputString("Mark as done : type D\nMark as not done : type U\nChange the color : type C\nDelete : type S\nCancel : type Q\n>>> ",
+                                                    ['d', 'u', 'c', 's', 'q', 'D', 'U', 'C', 'S', 'Q'], False).lower()
+                        match action:
+                            case 'd' | 'u':
+                                changed = todo.bulk_update({"done": action == 'd'}, **filters)
+                                print(Fore.GREEN + f"{changed} task(s) changed")
+                            case 'c':
+                                color = securedInputString("New color : ", list(colors) + ["normal"], False).lower()
+                                changed = todo.bulk_update({"color": color}, **filters)
+                                print(Fore.GREEN + f"{changed} task(s) changed")
+                            case 's':
+                                if securedInputString(f"Delete {count} task(s) ? (y/n) : ", ["y", "n", "Y", "N"], False).lower() == "y":
+                                    deleted = todo.bulk_delete(**filters)
+                                    print(Fore.GREEN + f"{deleted} task(s) deleted")
+                            case _:
+                                print(Fore.RED + "Operation aborted")
                     case 'q':
                         print("\033[2J\033[H", end="")
                         continue
@@ -492,7 +445,9 @@ def main():
                         continue
             case 'l': #L
                 # work in progress
-                tasks = todo.list_tasks() #=lst
+                criteria = {}   # filters of TodoList.list_page : only the printed page is sorted
+                text = None
+                found = None    # ranked results of a search by parts of words
                 sort = securedInputString("Choose a sort (optional):\nWithout sort: type L\nSort by task added date: type T\nSort by deadline: type DL\nSort alphabetically: type A\nSort by Done status: type D\nSort by priority: type P\nGo to main menu: type Q\n>>> ", 
                                           ["l", "L", "t", "T", "dl", "DL", "a", "A", "d", "D", "p", "P", "", "q"], 
                                           True)
@@ -500,39 +455,23 @@ def main():
                     print("\033[2J\033[H", end="")
                     continue
                 print("------------------------\n")
-                filter = securedInputString("Choose a filter (optional):\nWithout filter: type L\nShow tasks marked as done: type D\nShow tasks marked as not done : type U\nFilter by category type C\nFilter by color : type V\nFilter by priority level: type P\nGo to main menu: type Q\n>>> ", 
-                                          ["l", "L", "d", "D", "u", "U", "c", "C", "v", "V", "p", "P", "", "q"], 
+                filter = securedInputString("Choose a filter (optional):\nWithout filter: type L\nShow tasks marked as done: type D\nShow tasks marked as not done : type U\nFilter by category type C\nFilter by color : type V\nFilter by priority level: type P\nSearch words in the tasks: type R\nSearch parts of words (typos allowed): type F\nGo to main menu: type Q\n>>> ", 
+                                          ["l", "L", "d", "D", "u", "U", "c", "C", "v", "V", "p", "P", "r", "R", "f", "F", "", "q"], 
                                           True)
                 if filter.lower() == "q":
                     print("\033[2J\033[H", end="")
                     continue
                 print("\033[2J\033[H", end="")
                 print("------------------------")
-                if sort != "" and sort.lower() !="l":
-                    match sort.lower():
-                        case "t":
-                            tasks = todo.sort_tasks(tasks, "date_added")
-                        case "dl":
-                            tasks = todo.sort_tasks(tasks, "deadline")
-                        case "a":
-                            tasks = todo.sort_tasks(tasks, "alphabetically")
-                        case "d":
-                            tasks = todo.sort_tasks(tasks, "statut")
-                        case "p":
-                            tasks = todo.sort_tasks(tasks, "priority")
                 if filter != "" and filter.lower() !="l":
                     match filter.lower():
                         case "d":
-                            tasks = todo.filter_tasks(tasks, "done")
+                            criteria = todo.filter_criteria("done")
                         case "u":
-                            tasks = todo.filter_tasks(tasks, "not_done")
+                            criteria = todo.filter_criteria("not_done")
                         case "c":
-                            # parsing the json to get all existing category
-                            category_lst =[]
-                            for task in todo.tasks:
-                                task_category = task.get("theme", "")
-                                if task_category != "" and task_category not in category_lst:
-                                    category_lst.append(task_category)
+                            # all existing categories, read from the index
+                            category_lst = todo.store.values("theme")
                             # showing these categories to the user
                             print("Select a category :")
                             for category in category_lst:
@@ -543,14 +482,10 @@ def main():
                                 print("Not an existing category. Try again :")
                                 category_wanted = input("")
                             # filter the tasks
-                            tasks = todo.filter_tasks(tasks, "category", category=category_wanted)
+                            criteria = todo.filter_criteria("category", category=category_wanted)
                         case "v":
-                            # parsing the json to get all existing colors
-                            color_lst =[]
-                            for task in todo.tasks:
-                                task_color = task.get("color", "")
-                                if task_color != "" and task_color not in color_lst:
-                                    color_lst.append(task_color)
+                            # all existing colors, read from the index
+                            color_lst = todo.store.values("color")
                             # showing these colors to the user
                             print("Select a color :")
                             for color in color_lst:
@@ -561,20 +496,41 @@ def main():
                                 print("Not an existing color. Try again :")
                                 color_wanted = input("")
                             # filter the tasks
-                            tasks = todo.filter_tasks(tasks, "color", color=color_wanted)
+                            criteria = todo.filter_criteria("color", color=color_wanted)
                         case "p":
                             while True:
                                 priority_wanted = int(input("Select a priority level (0<=priority<=5) :\n"))
                                 if priority_wanted < 0 or priority_wanted > 5:
                                     continue
                                 break
-                            tasks = todo.filter_tasks(tasks, "priority", priority=priority_wanted)
+                            criteria = todo.filter_criteria("priority", priority=priority_wanted)
+                        case "r":
+                            # indexed search : every word, from its start, accents ignored
+                            text = securedInputString("Words to search : ", can_be_empty=False)
+                        case "f":
+                            # trigram search : anywhere in the text, 1 typo allowed in long words, best matches first
+                            words = securedInputString("Parts of words to search : ", can_be_empty=False)
+                            found = todo.find(words, max_errors=1)
+                sort_mode = None
+                if sort != "" and sort.lower() !="l":
+                    match sort.lower():
+                        case "t":
+                            sort_mode = "date_added"
+                        case "dl":
+                            sort_mode = "deadline"
+                        case "a":
+                            sort_mode = "alphabetically"
+                        case "d":
+                            sort_mode = "statut"
+                        case "p":
+                            sort_mode = "priority"
                 #print("id | done | theme | text | date | deadline | priority | color")
-                if not tasks or tasks == []:
-                    print("No task")
+                if found is not None:
+                    if sort_mode is not None:
+                        found = todo.sort_tasks(found, sort_mode)
+                    printPages(todo, slicePages(found))
                 else:
-                    for t in tasks:
-                        todo.print_task(t)           
+                    printPages(todo, lambda cursor: todo.list_page(TASKS_PER_PAGE, cursor, sort=sort_mode, text=text, **criteria))
             case 's': # mode == s
                 task_id_list = todo._printSumUpTask()
                 if (task_id_list and todo.tasks != []):
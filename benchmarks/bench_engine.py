@@ -0,0 +1,68 @@
+"""
+Hot paths of the task engine (todolist package), used by both the command line and the GUI :
+load, save, indexing, search, filters, sorts and the deadline scan
+
+    python benchmarks/bench_engine.py [number of tasks...]     (10 000 and 100 000 by default, ex : 10000 1000000)
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+from bench_formats import timed
+from bench_memory import make_json, todolist
+
+SORT_MODES = ("date_added", "deadline", "priority", "alphabetically", "statut")
+
+
+def bench(n, folder):
+    """[(name, seconds)] for a todoList of n tasks"""
+    path = os.path.join(folder, f"bench{n}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(make_json(n))
+    results = []
+
+    def run(name, function):
+        seconds, result = timed(function)
+        results.append((name, seconds))
+        return result
+
+    todo = run("load (JSON file)", lambda: todolist.TodoList(path))
+    run("save (JSON file)", todo._save)
+    tasks = todo.list_tasks()
+    run("index (TaskStore)", lambda: todolist.TaskStore(tasks))
+    run("index words (first search)", lambda: todo.store.text_index)
+    run("index trigrams (first find)", lambda: todo.store.trigram_index)
+    run("search words", lambda: todo.search("task deadline", done=False))
+    run("find with a typo", lambda: todo.find("deadlyne", max_errors=1))
+    run("filter, indexed query", lambda: todo.filter_tasks(None, "category", category="school"))
+    for mode in ("not_done", "priority"):
+        run(f"filter list ({mode})", lambda: todo.filter_tasks(tasks, mode, priority=3))
+    for mode in SORT_MODES:
+        run(f"sort ({mode})", lambda: todo.sort_tasks(tasks, mode))
+    run("deadline scan (overdue)", todo.overdue)
+    run("deadline scan (next 30 days)", lambda: todo.due_within(30))
+    run("add + delete 1000 tasks, 1 save", lambda: add_delete(todo, 1000))
+    return results
+
+
+def add_delete(todo, count):
+    """count tasks added then deleted in one batch() : the file is rewritten once"""
+    with todo.batch():
+        tasks = [todo.add_task(text=f"new task {i}", deadline=date.today(), theme="bench") for i in range(count)]
+        for task in tasks:
+            todo.delete_task(task.id)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    print(f"numpy : {'yes' if todolist.columnar.np is not None else 'no'} (used from {todolist.COLUMNAR_THRESHOLD} tasks)")
+    with tempfile.TemporaryDirectory() as folder:
+        all_results = [bench(n, folder) for n in sizes]
+    print(f"  {'':30}" + "".join(f"{n:>12}" for n in sizes))
+    for i, (name, _) in enumerate(all_results[0]):
+        print(f"  {name:30}" + "".join(f"{results[i][1] * 1000:10.1f}ms" for results in all_results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Save and load times, and file size, of the storage formats : JSON (.json), JSON Lines (.jsonl), binary (.tdb), SQLite (.db)
+
+    python benchmarks/bench_formats.py [number of tasks...]     (10 000 and 100 000 by default, ex : 10000 100000 1000000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from bench_memory import make_json, todolist
+
+FORMATS = (".json", ".jsonl", ".tdb", ".db")
+
+
+def timed(function):
+    """(seconds, result) of function()"""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def size_on_disk(path):
+    """size of the file, with the -wal file of SQLite"""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    with tempfile.TemporaryDirectory() as folder:
+        for n in sizes:
+            tasks = [todolist.Task.from_dict(task) for task in json.loads(make_json(n))["tasks"]]
+            print(f"{n} tasks")
+            print(f"  {'format':8} {'save (s)':>9} {'load (s)':>9} {'size (MiB)':>11}")
+            for suffix in FORMATS:
+                path = os.path.join(folder, f"bench{n}{suffix}")
+                todo = todolist.TodoList(path, load=False)
+                save_time, _ = timed(lambda: todo._save(tasks))
+                load_time, loaded = timed(lambda: todolist.TodoList(path))
+                assert len(loaded.tasks) == n
+                print(f"  {suffix:8} {save_time:9.2f} {load_time:9.2f} {size_on_disk(path) / 2**20:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
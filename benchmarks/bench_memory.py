@@ -0,0 +1,63 @@
+"""
+Memory used by the tasks of a big todoList : JSON dicts (old model) vs Task objects (__slots__)
+
+    python benchmarks/bench_memory.py [number of tasks]     (1 000 000 by default)
+"""
+import json
+import os
+import random
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)     # the todolist package, when the benchmark is run from anywhere
+
+import todolist
+
+
+def make_json(n):
+    """a todoList of n tasks as the JSON text of ToDoList.json"""
+    themes = ["default", "school", "famille", "python", "work", "sport"]
+    task_colors = ["normal", "red", "green", "blue", "yellow", "cyan", "magenta"]
+    first_day = date(2025, 1, 1)
+    tasks = []
+    for i in range(1, n + 1):
+        tasks.append({
+            "id": i,
+            "done": random.random() < 0.5,
+            "theme": random.choice(themes),
+            "text": f"Task number {i} to do before the deadline",
+            "date": (first_day + timedelta(days=random.randint(0, 365))).strftime("%d-%m-%Y"),
+            "deadline": random.choice(["", (first_day + timedelta(days=random.randint(0, 730))).strftime("%d-%m-%Y")]),
+            "priority": random.randint(0, 5),
+            "color": random.choice(task_colors),
+        })
+    return json.dumps({"tasks": tasks}, ensure_ascii=False)
+
+
+def measure(build):
+    """memory (bytes) still allocated by what build() returns"""
+    tracemalloc.start()
+    result = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    text = make_json(n)
+
+    dicts = measure(lambda: json.loads(text)["tasks"])
+    records = measure(lambda: [todolist.Task.from_dict(task) for task in json.loads(text)["tasks"]])
+
+    print(f"{n} tasks")
+    print(f"  dicts        : {dicts / 2**20:8.1f} MiB ({dicts / n:6.1f} bytes/task)")
+    print(f"  Task objects : {records / 2**20:8.1f} MiB ({records / n:6.1f} bytes/task)")
+    print(f"  {dicts / records:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
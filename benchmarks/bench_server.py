@@ -0,0 +1,85 @@
+"""
+Requests per second of the HTTP/JSON API (todolist/server.py) on a big todoList : the server runs in its own process,
+the clients send their requests one after the other on keep-alive connections
+
+    python benchmarks/bench_server.py [number of tasks] [connections]     (100 000 tasks and 20 connections by default)
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_memory import ROOT, make_json
+
+REQUESTS = 2000         # per kind of request, shared by the connections
+KINDS = {
+    "GET one task": lambda n, i: ("GET", f"/tasks/{random.randint(1, n)}", None),
+    "GET page (sorted by deadline)": lambda n, i: ("GET", f"/tasks?sort=deadline&offset={i * 100 % n}", None),
+    "GET page (filter + search)": lambda n, i: ("GET", f"/tasks?done=false&theme=school&search=deadline&offset={i % 50 * 100}", None),
+    "POST toggle (change a task)": lambda n, i: ("POST", f"/tasks/{random.randint(1, n)}/toggle", None),
+    "POST (add a task)": lambda n, i: ("POST", "/tasks", {"text": f"new task {i}", "theme": "bench", "priority": 2}),
+}
+
+
+async def request(reader, writer, method, path, body):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+    return int(head.split(b" ")[1])
+
+
+async def run(port, n, connections, make_request):
+    """seconds taken by REQUESTS requests sent on connections connections"""
+    async def client(first):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for i in range(first, REQUESTS, connections):
+            status = await request(reader, writer, *make_request(n, i))
+            assert status < 300, status
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(first) for first in range(connections)))
+    return time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "bench.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_json(n))
+        port = free_port()
+        code = f"import sys; sys.path.insert(0, {ROOT!r}); from todolist import server; server.serve({path!r}, port={port}, journal=True)"
+        process = subprocess.Popen([sys.executable, "-c", code])
+        try:
+            while True:     # until the todoList is loaded and the server listens
+                try:
+                    socket.create_connection(("127.0.0.1", port)).close()
+                    break
+                except ConnectionRefusedError:
+                    time.sleep(0.1)
+            print(f"{n} tasks, {connections} connections, {REQUESTS} requests of each kind")
+            for name, make_request in KINDS.items():
+                seconds = asyncio.run(run(port, n, connections, make_request))
+                print(f"  {name:32} {REQUESTS / seconds:8.0f} requests/s")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
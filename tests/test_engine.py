@@ -0,0 +1,300 @@
+"""
+Tests of the todolist package : journal replay, recovery of damaged files, lazy texts, ids, batches, merges and server writes
+
+    python -m unittest discover tests     (or python -m pytest tests)
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)     # the todolist package, when the tests are run from anywhere
+
+from todolist import CORRUPT_SUFFIX, JOURNAL_SUFFIX, IdAllocator, LazyTask, Task, TaskStore, TodoList, TodoServer
+
+
+def texts(todo):
+    return [task.text for task in todo.tasks]
+
+
+def files(path):
+    """bytes of the JSON file and of its journal (None if missing)"""
+    contents = []
+    for name in (path, path + JOURNAL_SUFFIX):
+        try:
+            with open(name, "rb") as f:
+                contents.append(f.read())
+        except FileNotFoundError:
+            contents.append(None)
+    return contents
+
+
+class TodoTestCase(unittest.TestCase):
+    """a folder of its own for each test, and TodoList mutations followed by check_invariants()"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "ToDoList.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def change(self, todo, method, *args, **kwargs):
+        result = getattr(todo, method)(*args, **kwargs)
+        todo.store.check_invariants()
+        return result
+
+    def fill(self, todo, *names):
+        return [self.change(todo, "add_task", text=name) for name in names]
+
+
+class JournalTest(TodoTestCase):
+    def test_changes_are_replayed(self):
+        todo = TodoList(self.path, journal=True)
+        first, second, third = self.fill(todo, "a", "b", "c")
+        self.change(todo, "update_task", second.id, {"text": "B", "done": True})
+        self.change(todo, "delete_task", first.id)
+        self.assertTrue(os.path.exists(self.path + JOURNAL_SUFFIX))
+        again = TodoList(self.path, journal=True)
+        again.store.check_invariants()
+        self.assertEqual([task.to_dict() for task in again.tasks], [task.to_dict() for task in todo.tasks])
+
+    def test_damaged_lines_are_skipped(self):
+        todo = TodoList(self.path, journal=True)
+        self.fill(todo, "a", "b")
+        with open(self.path + JOURNAL_SUFFIX, "ab") as f:
+            f.write(b'not json\n[1]\n"text"\n{"op": "put"}\n{"op": "del"}\n{"op": "put", "task": {"id": "x"}}\n'
+                    b'{"op": "put", "task": {"id": null}}\n{"op": "del", "id": [1]}\n\xff\xfe\n'
+                    b'{"op": "del", "id": 1}\n')
+        again = TodoList(self.path, journal=True)
+        again.store.check_invariants()
+        self.assertEqual(texts(again), ["b"])
+
+    def test_cut_last_line_is_dropped(self):
+        todo = TodoList(self.path, journal=True)
+        self.fill(todo, "a")
+        with open(self.path + JOURNAL_SUFFIX, "ab") as f:
+            f.write(b'{"op": "del", "id": 1')      # a crash in the middle of the append
+        again = TodoList(self.path, journal=True)
+        self.assertEqual(texts(again), ["a"])
+        with open(self.path + JOURNAL_SUFFIX, "rb") as f:
+            self.assertTrue(f.read().endswith(b"\n"))
+        self.fill(again, "b")
+        self.assertEqual(texts(TodoList(self.path, journal=True)), ["a", "b"])
+
+
+class RecoveryTest(TodoTestCase):
+    def test_damaged_file_is_read_from_backup(self):
+        todo = TodoList(self.path, backups=2)
+        self.fill(todo, "a", "b")
+        for damaged in ('{"tasks": [{"id": 1, "text": "a"', '{"tasks": [{"id": null}, {"id": 2}]}', "[]"):
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(damaged)
+            again = TodoList(self.path, backups=2)
+            again.store.check_invariants()
+            self.assertEqual(again.recovered_from, self.path + ".bak1")
+            self.assertEqual(texts(again), ["a"])
+            self.assertEqual(len(again.read_errors), 1)
+
+    def test_unreadable_file_is_moved_aside(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"tasks": [{"id": 1, "text": "precious"')
+        todo = TodoList(self.path)
+        self.assertEqual(todo.tasks, [])
+        self.assertEqual(todo.moved_aside, self.path + CORRUPT_SUFFIX)
+        self.fill(todo, "new")
+        with open(todo.moved_aside, encoding="utf-8") as f:
+            self.assertIn("precious", f.read())
+
+    def test_damaged_json_lines_are_skipped(self):
+        path = os.path.join(self.folder, "ToDoList.jsonl")
+        damaged = (b'not json\n[1]\n"text"\n{"text": "no id"}\n{"id": "x"}\n{"id": true}\n\xff\xfe\n'
+                   b'{"id": null, "deleted": true}\n')
+        todo = TodoList(path)
+        self.fill(todo, "a", "b")
+        with open(path, "ab") as f:
+            f.write(damaged)
+        again = TodoList(path)
+        again.store.check_invariants()
+        self.assertEqual(texts(again), ["a", "b"])
+        with open(path, "ab") as f:
+            f.write(damaged + b'{"id": 1, "deleted": true}\n')
+        self.assertTrue(again.refresh())
+        again.store.check_invariants()
+        self.assertEqual(texts(again), ["b"])
+
+
+class LazyTest(TodoTestCase):
+    def test_texts_are_read_from_the_file(self):
+        names = ["a", "é" * 3000, "b, c", "d"]      # a text longer than the first read of a task
+        todo = TodoList(self.path)
+        self.fill(todo, *names)
+        lazy = TodoList(self.path, lazy=True)
+        self.assertEqual(lazy.tasks[1].text, names[1])
+        LazyTask.read_texts(lazy.tasks[3:] + lazy.tasks[:3])
+        self.assertEqual(texts(lazy), names)
+        self.assertEqual([task.id for task in lazy.search("c")], [3])
+
+    def test_rewritten_file_is_refused(self):
+        todo = TodoList(self.path)
+        self.fill(todo, "a", "b")
+        lazy = TodoList(self.path, lazy=True)
+        self.change(todo, "update_task", 1, {"text": "A"})
+        with self.assertRaises(ValueError):
+            LazyTask.read_texts(lazy.tasks)
+
+
+class IdAllocatorTest(unittest.TestCase):
+    def test_lowest_unused_id(self):
+        allocator = IdAllocator([2, 5, 6])
+        used = {2, 5, 6}
+        for expected in (1, 3, 4, 7, 8):
+            task_id = allocator.allocate(used)
+            self.assertEqual(task_id, expected)
+            used.add(task_id)
+        used.discard(3)
+        allocator.release(3)
+        self.assertEqual(allocator.allocate(used), 3)
+
+    def test_taken_ids_are_skipped(self):
+        allocator = IdAllocator([1])
+        allocator.take(10)
+        allocator.take(4)       # inside the gap 2-9
+        used = {1, 4, 10}
+        self.assertEqual([allocator.allocate(used) for _ in range(3)], [2, 3, 5])
+
+    def test_huge_id_keeps_a_small_heap(self):
+        allocator = IdAllocator([1, 10_000_000])
+        self.assertLess(len(allocator.free), 10)
+        self.assertEqual(allocator.allocate({1, 10_000_000}), 2)
+
+    def test_store_ids(self):
+        store = TaskStore([Task(1, "a"), Task(3, "c")])
+        store.add(Task(store.new_id(), "b"))
+        store.check_invariants()
+        self.assertEqual([task.id for task in store.tasks], [1, 2, 3])
+        store.remove(1)
+        store.check_invariants()
+        self.assertEqual(store.new_id(), 1)
+
+
+class BatchTest(TodoTestCase):
+    def test_exception_rolls_back(self):
+        todo = TodoList(self.path, journal=True)
+        first, second = self.fill(todo, "a", "b")
+        before = [task.to_dict() for task in todo.tasks]
+        on_disk = files(self.path)
+        with self.assertRaises(RuntimeError):
+            with todo.batch():
+                self.change(todo, "add_task", text="c")
+                self.change(todo, "update_task", first.id, {"text": "A", "priority": 3})
+                self.change(todo, "delete_task", second.id)
+                raise RuntimeError("cancel")
+        todo.store.check_invariants()
+        self.assertEqual([task.to_dict() for task in todo.tasks], before)
+        self.assertEqual(files(self.path), on_disk)
+        self.assertEqual([task.to_dict() for task in TodoList(self.path, journal=True).tasks], before)
+
+    def test_changes_are_written_at_the_end(self):
+        todo = TodoList(self.path)
+        with todo.batch():
+            self.fill(todo, "a", "b", "c")
+            self.change(todo, "bulk_update", {"done": True}, text="b")
+            self.assertFalse(os.path.exists(self.path))
+        again = TodoList(self.path)
+        self.assertEqual(texts(again), ["a", "b", "c"])
+        self.assertEqual([task.done for task in again.tasks], [False, True, False])
+
+    def test_unknown_fields_are_refused(self):
+        todo = TodoList(self.path)
+        task, = self.fill(todo, "a")
+        for changes in ({"id": 5}, {"txt": "x"}):
+            with self.assertRaises(ValueError):
+                todo.update_task(task.id, changes)
+            todo.store.check_invariants()
+
+
+class MergeTest(TodoTestCase):
+    def test_changes_of_two_programs_are_merged(self):
+        for journal in (False, True):
+            with self.subTest(journal=journal):
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                first = TodoList(self.path, journal=journal)
+                second = TodoList(self.path, journal=journal)
+                self.fill(first, "from first")
+                self.fill(second, "from second")        # second never saw the task of first : same free id
+                self.change(first, "update_task", 1, {"priority": 4})
+                merged = TodoList(self.path, journal=journal)
+                merged.store.check_invariants()
+                self.assertEqual(sorted(texts(merged)), ["from first", "from second"])
+                self.assertEqual(len({task.id for task in merged.tasks}), 2)
+
+    def test_refresh_applies_the_changes_of_another_program(self):
+        todo = TodoList(self.path, journal=True)
+        self.fill(todo, "a", "b")
+        other = TodoList(self.path, journal=True)
+        self.change(other, "update_task", 2, {"text": "B"})
+        self.change(other, "delete_task", 1)
+        self.assertTrue(todo.refresh())
+        todo.store.check_invariants()
+        self.assertEqual(texts(todo), ["B"])
+        self.assertFalse(todo.refresh())
+
+    def test_unreadable_dates_are_kept(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"tasks": [{"id": 1, "text": "a", "date": "bad", "deadline": "31-02-2026"}]}, f)
+        todo = TodoList(self.path)
+        self.assertIsNone(todo.tasks[0].deadline)
+        with self.assertRaises(RuntimeError):
+            with todo.batch():
+                self.change(todo, "update_task", 1, {"deadline": None})
+                raise RuntimeError("cancel")
+        self.change(todo, "update_task", 1, {"text": "A"})
+        saved = TodoList(self.path).tasks[0].to_dict()
+        self.assertEqual((saved["date"], saved["deadline"]), ("bad", "31-02-2026"))
+        self.change(todo, "update_task", 1, {"deadline": None})     # changed : the new value is written
+        saved = TodoList(self.path).tasks[0].to_dict()
+        self.assertEqual((saved["date"], saved["deadline"]), ("bad", ""))
+
+    def test_unknown_keys_are_kept(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"tasks": [{"id": 1, "text": "a", "time": "10:30"}]}, f)
+        for target in ("copy.db", "copy.jsonl", "copy.tdb", "copy.json"):
+            path = os.path.join(self.folder, target)
+            TodoList(self.path).export(path)
+            self.assertEqual(TodoList(path).tasks[0].extra, {"time": "10:30"}, target)
+
+
+class ServerTest(TodoTestCase):
+    def test_failed_write_is_rolled_back(self):
+        todo = TodoList(self.path, journal=True)
+        self.fill(todo, "a", "b")
+        before = [task.to_dict() for task in todo.tasks]
+
+        def disk_full(records, tasks=None):
+            raise OSError("no space left on device")
+
+        async def requests():
+            server = TodoServer(todo)
+            await server.start("127.0.0.1", 0)
+            todo.write_changes = disk_full
+            answers = [await server._dispatch("POST", "/tasks", b'{"text": "c"}'),
+                       await server._dispatch("PATCH", "/tasks/1", b'{"text": "A"}'),
+                       await server._dispatch("DELETE", "/tasks/2", b"")]
+            todo.store.check_invariants()
+            self.assertEqual([task.to_dict() for task in todo.tasks], before)
+            del todo.write_changes
+            answers.append(await server._dispatch("PATCH", "/tasks/1", b'{"text": "A"}'))
+            return [status for status, _ in answers]
+
+        self.assertEqual(asyncio.run(requests()), [500, 500, 500, 200])
+        self.assertEqual(texts(TodoList(self.path, journal=True)), ["A", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
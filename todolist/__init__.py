@@ -0,0 +1,19 @@
+"""
+The task engine of the todoList, shared by the command line (ToDo-List.py) and the window (ToDo-List-GUI.py)
+
+    from todolist import TodoList
+    todo = TodoList("ToDoList.json", journal=True, backups=2)
+    todo.add_task(text="Revise for the exam", theme="school", deadline=None)
+"""
+from .columnar import COLUMNAR_THRESHOLD, ColumnarTable
+from .engine import (BACKUP_SUFFIX, CORRUPT_SUFFIX, JOURNAL_COMPACT_SIZE, JOURNAL_SUFFIX, PAGE_FIELDS, SORT_KEYS, TodoList,
+                     apply_records, diff_tasks, page_cursor)
+from .jsonfile import JSON_CHUNK_SIZE, iter_json_tasks, read_json_task_at, write_json_tasks
+from .locking import LOCK_SUFFIX, FileLock
+from .search import TextIndex, TrigramIndex, fold_text, substring_distance, tokenize
+from .server import TodoServer
+from .storage import (BINARY_SUFFIX, JSONL_SUFFIX, TMP_SUFFIX, JsonLinesStorage, SqliteStorage, iter_binary_tasks,
+                      write_binary_tasks)
+from .store import IdAllocator, TaskStore
+from .task import LazyTask, Task, format_date, is_task_dict, parse_date
+from .watch import FileWatcher
@@ -0,0 +1,105 @@
+"""
+ColumnarTable : sorts and pages of very big todoLists with numpy (optional)
+"""
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, it's only used to sort very big todoLists
+    np = None
+
+COLUMNAR_THRESHOLD = 50_000            # from this number of tasks, sorts use numpy (if it's installed)
+
+
+class ColumnarTable:
+    """
+    The tasks as numpy columns, so that filters are boolean masks and sorts are argsorts
+        done, priority, date/deadline (ordinals, NO_DATE if there's none), theme/color (category codes)
+    The Task objects (and their text) stay in a side list, used to give back the result
+    Raise ValueError (from numpy) if a column can't be built, ex : a priority that isn't a number
+    """
+    NO_DATE = -1
+    AFTER_ALL_DATES = date.max.toordinal() + 1
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        n = len(self.tasks)
+        self.ids = np.fromiter((t.id for t in self.tasks), dtype=np.int64, count=n)     # ordered, like the tasks
+        self.done = np.fromiter((bool(t.done) for t in self.tasks), dtype=bool, count=n)
+        self.priority = np.fromiter((t.priority for t in self.tasks), dtype=np.int64, count=n)
+        self.date = np.fromiter((t.date.toordinal() if t.date else self.NO_DATE for t in self.tasks), dtype=np.int64, count=n)
+        self.deadline = np.fromiter((t.deadline.toordinal() if t.deadline else self.NO_DATE for t in self.tasks),
+                                    dtype=np.int64, count=n)
+        self.theme_codes, self.theme = self._categories(t.theme for t in self.tasks)
+        self.color_codes, self.color = self._categories(t.color for t in self.tasks)
+
+    def _categories(self, values):
+        """{value: code} and the column of codes"""
+        codes = {}
+        column = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int32, count=len(self.tasks))
+        return codes, column
+
+    def _rows(self, indices):
+        tasks = self.tasks
+        return [tasks[i] for i in indices.tolist()]
+
+    def sort(self, mode, reverse=False):
+        """same orders as TodoList.sort_tasks (stable sorts), None if the mode isn't handled here"""
+        if mode == "date_added":
+            key = np.where(self.date == self.NO_DATE, np.iinfo(np.int64).max, self.date)     # no date = at the end
+        elif mode == "deadline":
+            key = self.deadline         # NO_DATE < every ordinal : no deadline = at the beginning
+        elif mode == "priority":
+            key = self.priority
+        elif mode == "statut":
+            # done tasks first : two masks, no sort needed
+            first, second = (~self.done, self.done) if reverse else (self.done, ~self.done)
+            return self._rows(np.concatenate((np.flatnonzero(first), np.flatnonzero(second))))
+        else:
+            return None                 # alphabetically : the texts aren't in the table
+        if reverse:
+            key = -key                  # like sorted(reverse=True) : ties keep their order
+        return self._rows(np.argsort(key, kind="stable"))
+
+    def _key(self, mode, reverse):
+        """column ordering the rows like sort(mode, reverse) when sorted stably (ascending), None if the mode isn't handled"""
+        if mode == "date_added":
+            key = np.where(self.date == self.NO_DATE, self.AFTER_ALL_DATES, self.date)
+        elif mode == "deadline":
+            key = self.deadline
+        elif mode == "priority":
+            key = self.priority
+        elif mode == "statut":
+            key = (~self.done).astype(np.int64)     # done tasks first
+        else:
+            return None
+        return -key if reverse else key
+
+    def page(self, mode, reverse, limit, after=None, **criteria):
+        """
+        the limit first tasks in the order of sort(mode, reverse), among the ones matching criteria (field=value of
+        theme, color, priority, done) and coming after the Task after (only its id and its sorted field are used)
+        the page is selected with a partition (O(n)), only its tasks are sorted
+        None if the mode isn't handled here
+        """
+        key = self._key(mode, reverse)
+        if key is None:
+            return None
+        mask = np.ones(len(self.tasks), dtype=bool)
+        for field, value in criteria.items():
+            if field in ("theme", "color"):
+                mask &= getattr(self, field) == getattr(self, f"{field}_codes").get(value, -1)
+            elif field == "priority" and not isinstance(value, int):
+                return []
+            else:
+                mask &= getattr(self, field) == value
+        if after is not None:
+            # (key, id) after the ones of the task : ties are ordered by id, like the stable sort
+            after_key = ColumnarTable([after])._key(mode, reverse)[0]
+            mask &= (key > after_key) | ((key == after_key) & (self.ids > after.id))
+        rows = np.flatnonzero(mask)
+        if len(rows) > limit:
+            # every row up to the limit-th key, with all its ties (ordered by id once sorted below)
+            kth = np.partition(key[rows], limit - 1)[limit - 1]
+            rows = rows[key[rows] <= kth]
+        return self._rows(rows[np.argsort(key[rows], kind="stable")][:limit])
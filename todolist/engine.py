@@ -0,0 +1,799 @@
+"""
+TodoList : the tasks of a todoList file and everything done with them, without any display
+(the command line and the window both work on it)
+"""
+import base64
+import bisect
+import contextlib
+import heapq
+import json
+import os
+from datetime import date
+from datetime import timedelta
+from operator import attrgetter, neg, not_
+
+from .columnar import COLUMNAR_THRESHOLD, ColumnarTable, np
+from .jsonfile import _file_state, iter_json_tasks, write_json_tasks
+from .locking import FileLock
+from .storage import (BINARY_SUFFIX, JSONL_SUFFIX, TMP_SUFFIX, JsonLinesStorage, SqliteStorage, _fsync_dir,
+                      iter_binary_tasks, write_binary_tasks)
+from .store import TaskStore
+from .task import LazyTask, Task, is_task_dict
+
+JOURNAL_SUFFIX = ".journal"            # the journal lives next to the JSON file : ToDoList.json.journal
+JOURNAL_COMPACT_SIZE = 1024 * 1024     # once the journal is bigger than this (bytes), it's folded into the JSON file
+BACKUP_SUFFIX = ".bak"                 # old versions : ToDoList.json.bak1 (newest), ToDoList.json.bak2...
+CORRUPT_SUFFIX = ".corrupt"            # a damaged file with no readable version left is kept there : ToDoList.json.corrupt
+
+
+def apply_records(store, records):
+    """
+    apply mutation records on store : {"op": "put", "task": Task} or {"op": "del", "id": id}
+    a task added by this program ({"op": "put", "task": Task, "new": True}) whose id was taken meanwhile
+    by another program gets a new id (the Task is changed), it doesn't replace the other one
+    """
+    for record in records:
+        if record["op"] == "del":
+            if record["id"] in store.by_id:
+                store.remove(record["id"])
+            continue
+        task = record["task"]
+        if record.get("new") and task.id in store.by_id and store.by_id[task.id] is not task:
+            task.id = store.new_id()
+        store.put(task)
+
+
+_task_values = attrgetter(*Task.FIELDS[1:], "extra")
+
+
+def diff_tasks(store, tasks):
+    """
+    records (see apply_records) turning the tasks of store into tasks (read again from the file) :
+    a put for each added or changed task, a del for each id that's gone, nothing for the tasks that didn't change
+    """
+    records = []
+    by_id = store.by_id
+    for task in tasks:
+        old = by_id.get(task.id)
+        if old is None or _task_values(old) != _task_values(task):
+            records.append({"op": "put", "task": task})
+    ids = {task.id for task in tasks}
+    records += [{"op": "del", "id": task_id} for task_id in by_id if task_id not in ids]
+    return records
+
+
+def _journal_records(data):
+    """
+    records of complete journal lines (bytes), the damaged lines are skipped :
+    not JSON, not an object, a put without a valid task, a del without an int id
+    """
+    records = []
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if not isinstance(record, dict):
+            continue
+        if record.get("op") == "put" and is_task_dict(record.get("task")):
+            try:
+                task = Task.from_dict(record["task"])
+            except (KeyError, TypeError, AttributeError, ValueError):
+                continue
+            records.append({"op": "put", "task": task})
+        elif record.get("op") == "del" and type(record.get("id")) is int:
+            records.append({"op": "del", "id": record["id"]})
+    return records
+
+
+def _task_dict(data):
+    """data if it's a task (see is_task_dict), else raise ValueError : the version holding it is damaged"""
+    if not is_task_dict(data):
+        raise ValueError(f"a task has no valid id : {str(data)[:100]}")
+    return data
+
+
+def _appended(old, new):
+    """True if a file went from the stats old to new (see _file_state) only by growing (same inode)"""
+    return old is not None and new is not None and old[0] == new[0] and new[2] >= old[2]
+
+
+def _key_date(task):
+    return task.date or date.max
+
+
+def _key_deadline(task):
+    d = task.deadline
+    if d is None:
+        return (0, date.min)
+    return (1, d)
+
+
+def _key_text(task):
+    return task.text.lower()
+
+
+# sort_tasks keys (the dates are already parsed : Task.date / Task.deadline)
+SORT_KEYS = {
+    "date_added": _key_date,
+    "priority": attrgetter("priority"),
+    "alphabetically": _key_text,
+    "deadline": _key_deadline,
+}
+# the field of a task giving its place in each order of list_page (None = by id), kept in the cursors
+PAGE_FIELDS = {None: "id", "date_added": "date", "deadline": "deadline", "priority": "priority",
+               "alphabetically": "text", "statut": "done"}
+# type of each of those fields in a cursor (as in the JSON file : the dates are dd-mm-yyyy strings, "" = no date)
+CURSOR_TYPES = {"id": int, "date": str, "deadline": str, "priority": int, "text": str, "done": bool}
+
+
+def _page_keys(tasks, sort, reverse):
+    """
+    ((key, id), task) for each task, the key giving it its own place in the order of sort_tasks(tasks, sort, reverse) :
+    ties by id like the stable sort, -id when reversed (the biggest keys come first, see heapq.nlargest)
+    built with map/zip : at most one python call per task (the sort key)
+    """
+    ids = map(attrgetter("id"), tasks)
+    if reverse:
+        ids = map(neg, ids)
+    if sort == "statut":
+        keys = map(not_, map(attrgetter("done"), tasks))      # done tasks first
+    else:
+        keys = map(SORT_KEYS[sort], tasks)
+    return zip(zip(keys, ids), tasks)
+
+
+def page_cursor(task, sort=None, reverse=False):
+    """cursor of a page of list_page ending with task : the sort and the place of the task in it, as a URL-safe string"""
+    field = PAGE_FIELDS[sort]
+    position = {"id": task.id, field: task.to_dict()[field]}
+    data = json.dumps([sort, bool(reverse), position], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def _read_cursor(cursor, sort, reverse):
+    """a Task with only the fields of the place kept in cursor, raise ValueError if it isn't a cursor of this sort"""
+    try:
+        cursor_sort, cursor_reverse, position = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError(f"invalid cursor : {cursor}")
+    if cursor_sort != sort or cursor_reverse != bool(reverse):
+        raise ValueError("the cursor comes from a list with another sort")
+    # type() : True isn't an id, a task made of anything else would break the comparisons of list_page
+    if not isinstance(position, dict) or any(type(position.get(field)) is not CURSOR_TYPES[field]
+                                             for field in ("id", PAGE_FIELDS[sort])):
+        raise ValueError(f"invalid cursor : {cursor}")
+    task = Task.from_dict(position)
+    field = PAGE_FIELDS[sort]
+    if field in ("date", "deadline") and position[field] and getattr(task, field) is None:
+        raise ValueError(f"invalid cursor : {cursor}")      # not a dd-mm-yyyy date
+    return task
+
+
+class TodoList:
+    def __init__(self, file_path: str = "ToDoList.json", journal: bool = False, backups: int = 0, lazy: bool = False,
+                 load: bool = True):
+        self.file_path = file_path
+        self.journal = journal      # if True, mutations are appended to the journal instead of rewriting the whole file
+        self.journal_path = file_path + JOURNAL_SUFFIX
+        self.journal_size = 0       # bytes appended to the journal since the last rewrite of the file
+        self.backups = backups      # number of old versions kept as .bak files
+        # .db files are SQLite databases, .jsonl files JSON Lines, everything else is a JSON (or binary .tdb) file
+        if file_path.endswith(".db"):
+            self.storage = SqliteStorage(file_path)
+        elif file_path.endswith(JSONL_SUFFIX):
+            self.storage = JsonLinesStorage(file_path)
+        else:
+            self.storage = None
+        self.binary = file_path.endswith(BINARY_SUFFIX)
+        # if True, the texts of the JSON file are only read when used
+        self.lazy = lazy and self.storage is None and not self.binary
+        # only one program at a time reads or writes the files of the todoList
+        self.lock = FileLock(file_path)
+        self.disk_state = None            # _disk_state() when the tasks were last read or written (see changed_on_disk)
+        self.recovered_from = None        # path of the .bak file read because the newer versions were damaged
+        self.read_errors = []             # why those newer versions couldn't be read
+        self.moved_aside = None           # path the damaged file was moved to, when no version at all could be read
+        self.store = TaskStore()
+        self._columnar = (None, None, None)     # (store, store version, ColumnarTable of every task)
+        self._batch = None                # {id: last record} of the changes of the running batch()
+        if load:        # load=False : the caller reads the tasks itself (see read_store)
+            self._load()
+
+    @property
+    def tasks(self):
+        """the tasks ordered by id"""
+        return self.store.tasks
+
+    @property
+    def tasks_by_id(self):
+        return self.store.by_id
+
+    def _backup_path(self, generation: int):
+        return f"{self.file_path}{BACKUP_SUFFIX}{generation}"
+
+    def _read_snapshot(self, path, lazy=False):
+        """
+        read one version of the todoList, raise ValueError if it's unreadable or damaged
+        the file is streamed : the tasks are built one by one, the whole JSON document is never in memory
+        lazy=True : the texts stay in the file (LazyTask), they are read when used
+        """
+        try:
+            if self.binary:
+                return list(iter_binary_tasks(path))
+            if lazy:
+                state = _file_state(path)       # one tuple shared by the tasks, to see if the file is rewritten later
+                return [LazyTask.from_source(_task_dict(task), path, offset, state)
+                        for offset, task in iter_json_tasks(path, offsets=True)]
+            return [Task.from_dict(_task_dict(task)) for task in iter_json_tasks(path)]
+        except (OSError, ValueError) as e:         # read error, or not a todoList / damaged JSON
+            raise ValueError(f"{path} can't be read : {e}")
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"{path} contains an invalid task : {e}")
+
+    def _recover(self):
+        """
+        return the tasks of the most recent readable version : the JSON file, then the .bak files from newest to oldest
+        return [] if there's nothing to read
+        the versions that couldn't be read are in read_errors, the one read in recovered_from (if it's a .bak file)
+        if the file exists but no version can be read, it's moved to moved_aside : the next save would replace it
+        """
+        self.recovered_from = None
+        self.read_errors = []
+        self.moved_aside = None
+        candidates = [self.file_path] + [self._backup_path(i) for i in range(1, max(self.backups, 1) + 1)]
+        for path in candidates:
+            if not os.path.exists(path):
+                continue
+            try:
+                tasks = self._read_snapshot(path, lazy=self.lazy)
+            except ValueError as e:
+                self.read_errors.append(str(e))
+                continue
+            if path != self.file_path:
+                self.recovered_from = path
+            return tasks
+        if os.path.exists(self.file_path):
+            self.moved_aside = self._corrupt_path()
+            os.replace(self.file_path, self.moved_aside)
+        return []
+
+    def _corrupt_path(self):
+        """ToDoList.json.corrupt, or .corrupt2, .corrupt3... if it's taken : an older damaged file is never replaced"""
+        path = self.file_path + CORRUPT_SUFFIX
+        generation = 1
+        while os.path.exists(path):
+            generation += 1
+            path = f"{self.file_path}{CORRUPT_SUFFIX}{generation}"
+        return path
+
+    def read_store(self):
+        """
+        read the tasks of the file (and of its journal) into a new TaskStore
+        self.store isn't touched, so the reading can run in another thread (the window does)
+        """
+        with self.lock:     # the journal (or JSON Lines file) of a program writing now would look cut, and be truncated
+            if self.storage is not None:
+                store = TaskStore(self.storage.load())
+            else:
+                store = TaskStore(self._recover())
+                self._replay_journal(store)
+            self.disk_state = self._disk_state()
+        return store
+
+    def _load(self):
+        self.store = self.read_store()
+
+    def _disk_state(self):
+        """
+        what's on disk, in a few stats : (inode, modification time, size) of the file and of its journal
+        (each save renames a new file over the old one, so the inode is the generation of the file)
+        with SQLite, its data_version, which only changes when another program writes
+        """
+        if isinstance(self.storage, SqliteStorage):
+            return self.storage.data_version()
+        return (_file_state(self.file_path), _file_state(self.journal_path))
+
+    def changed_on_disk(self):
+        """True if another program changed the todoList since it was read or written here (nothing is parsed)"""
+        return self._disk_state() != self.disk_state
+
+    def refresh(self):
+        """
+        read the changes of another program if there are some, return True if there were
+        only the changed tasks are replaced (see read_appended and diff_tasks), the indexes aren't rebuilt
+        cheap when nothing changed, so it can be called often (ex : before each command)
+        """
+        if self._batch is not None or not self.changed_on_disk():
+            return False
+        records = self.read_appended()
+        if records is None:
+            if self.lazy:       # the texts left in the old file can't be compared anymore
+                self._load()
+                return True
+            records = diff_tasks(self.store, self.read_store().tasks)
+        apply_records(self.store, records)
+        return True
+
+    def read_appended(self):
+        """
+        records (see apply_records) of the changes another program appended since the todoList was read or written here,
+        only the new lines of the journal (or of the JSON Lines file) are read
+        None if they can't be known that way (the file was rewritten, SQLite...) : everything has to be read again
+        self.store isn't touched, so the reading can run in another thread (like read_store)
+        """
+        if isinstance(self.storage, SqliteStorage) or self.disk_state is None:
+            return None
+        with self.lock:
+            (old_file, old_journal), state = self.disk_state, self._disk_state()
+            new_file, new_journal = state
+            if isinstance(self.storage, JsonLinesStorage):
+                if not _appended(old_file, new_file):
+                    return None
+                records = self.storage.read_appended()
+            else:
+                if new_file != old_file or not (_appended(old_journal, new_journal)
+                                                or old_journal is None and self.journal_size == 0):
+                    return None
+                records = []
+                if new_journal is not None:
+                    with open(self.journal_path, "rb") as f:
+                        f.seek(self.journal_size)
+                        data = f.read()
+                    end = data.rfind(b"\n") + 1      # a line being written stays for the next time
+                    self.journal_size += end
+                    records = _journal_records(data[:end])
+            self.disk_state = self._disk_state()
+        return records
+
+    def _merge(self, records):
+        """
+        the todoList was changed by another program since it was read here : return a new TaskStore of what's on
+        disk with records (the changes made here) applied on top, each task as last written
+        """
+        store = self.read_store()
+        apply_records(store, records)
+        return store
+
+    def _replay_journal(self, store):
+        """
+        apply the records of the journal (if any) on top of the loaded JSON file
+        """
+        self.journal_size = 0
+        if not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):     # last line cut by a crash : the mutation never happened, drop it
+                    f.truncate(end)
+            self.journal_size = end
+            apply_records(store, _journal_records(data[:end]))
+        except OSError:
+            pass
+
+    def _save(self, tasks=None):
+        """
+        Save the todoList : every task (or tasks, a copy of them made by the caller)
+        The file is written next to the JSON file then renamed over it, so a crash never leaves a half-written todoList
+        """
+        if tasks is None:
+            tasks = self.tasks
+        with self.lock:
+            self._save_locked(tasks)
+            self.disk_state = self._disk_state()
+
+    def _save_locked(self, tasks):
+        LazyTask.read_texts(tasks)      # every text is written : read them at once, not one open of the file per task
+        if self.storage is not None:
+            self.storage.save_all(tasks)
+            return
+
+        tmp_path = self.file_path + TMP_SUFFIX
+        if self.binary:
+            with open(tmp_path, "wb") as f:
+                write_binary_tasks(f, tasks)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                write_json_tasks(f, tasks)      # same text as json.dump(indent=4), false for emojis (maybe)
+                f.flush()
+                os.fsync(f.fileno())        # the data is on the disk before the rename
+        if self.backups > 0 and os.path.exists(self.file_path):
+            # bak2 -> bak3, bak1 -> bak2, JSON file -> bak1 (renames only, nothing is copied)
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(self._backup_path(i)):
+                    os.replace(self._backup_path(i), self._backup_path(i + 1))
+            os.replace(self.file_path, self._backup_path(1))
+        os.replace(tmp_path, self.file_path)       # atomic
+        _fsync_dir(self.file_path)
+        # the JSON file is now up to date, the journal is not needed anymore
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.journal_size = 0
+
+    def rewrite_needed(self, task_count=None):
+        """
+        True if the next write must rewrite every task : no journal, a journal that got too big,
+        or a JSON Lines file with too many old lines (task_count = number of tasks, by default len(tasks))
+        """
+        if isinstance(self.storage, JsonLinesStorage):
+            return self.storage.compact_needed(len(self.tasks) if task_count is None else task_count)
+        if self.storage is not None:
+            return False
+        return not self.journal or self.journal_size > JOURNAL_COMPACT_SIZE
+
+    def _write(self, records, tasks=None):
+        """
+        write mutations ({"op": "put", "task": Task} or {"op": "del", "id": id}) : with a database only their rows,
+        in journal mode they are appended to the journal
+        tasks given (see rewrite_needed) : the whole file is rewritten with them instead
+        """
+        with self.lock:
+            self._write_locked(records, tasks)
+            self.disk_state = self._disk_state()
+
+    def write_changes(self, records, tasks=None):
+        """
+        _write() for a program that keeps its own tasks (the window writes a copy of them from its file thread)
+        if another program changed the todoList meanwhile, records are merged into what's on disk instead (see _merge),
+        the result is written and returned as a new TaskStore (None if there was nothing to merge)
+        """
+        with self.lock:
+            if not self.changed_on_disk():
+                self._write(records, tasks)
+                return None
+            store = self._merge(records)
+            self._write(records, store.tasks if self.rewrite_needed(len(store)) else None)
+            return store
+
+    def _write_locked(self, records, tasks):
+        if tasks is not None:
+            self._save(tasks)
+        elif self.storage is not None:
+            self.storage.write_many([r["task"] for r in records if r["op"] == "put"],
+                                    [r["id"] for r in records if r["op"] == "del"])
+        else:
+            lines = []
+            for record in records:
+                if record["op"] == "put":
+                    record = {"op": "put", "task": record["task"].to_dict()}
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_size = os.path.getsize(self.journal_path)
+
+    def _persist(self, record):
+        """
+        Save one mutation : {"op": "put", "task": Task} or {"op": "del", "id": id}
+        In journal mode the record is appended to the journal, else the whole file is rewritten
+        With a SQLite database only the row of the task is written
+        During a batch() the record is only kept, everything is written at the end
+        """
+        if self._batch is not None:
+            task_id = record["task"].id if record["op"] == "put" else record["id"]
+            if record["op"] == "put" and self._batch.get(task_id, {}).get("new"):
+                record = dict(record, new=True)     # still a task added by this batch
+            self._batch[task_id] = record      # only the last change of each task matters
+            return
+        self._persist_many([record])
+
+    def _persist_many(self, records):
+        """
+        save several mutations at once : one transaction, one rewrite, or one append to the journal
+        if another program changed the todoList since it was read, its changes are read first (see _merge),
+        so a rewrite never erases them
+        """
+        if not records:
+            return
+        with self.lock:
+            if self.changed_on_disk():
+                self.store = self._merge(records)
+            if self.rewrite_needed():
+                self._save()
+                return
+            self._write(records)
+            if self.rewrite_needed():       # the journal got too big (or the JSON Lines file too long) : folded right away
+                self._compact()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        with todo.batch(): ...
+        the changes made inside are written once, when the block ends (one SQLite transaction,
+        one rewrite of the JSON file or one append to the journal) instead of once per change
+        if an exception leaves the block, the tasks in memory are put back as they were and nothing is written
+        a batch() inside a batch() is part of the outer one
+        """
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = {}
+        self.store.undo_log = []
+        try:
+            yield self
+        except BaseException:
+            self.store.rollback()
+            self._batch = None
+            raise
+        records, self._batch = self._batch, None
+        self.store.undo_log = None
+        self._persist_many(list(records.values()))
+
+    def _compact(self):
+        """
+        fold the journal into the JSON file (the tasks in memory already contain every record)
+        """
+        self._save()
+
+    def add_task(self, *, text: str, theme: str = "default", date= date.today(),
+                 deadline=None, priority: int = 0,
+                 color: str = "normal", done: bool = False):
+        """add a task and return it"""
+        new_task = Task(self.store.new_id(), # unique id at a given time
+                        text,
+                        done=done,
+                        theme=theme,
+                        date=date,
+                        deadline=deadline or None,     # "" = no deadline
+                        priority=priority,
+                        color=color)
+        # inserting at the correct index in the JSON (id)
+        self.store.add(new_task)
+        self._persist({"op": "put", "task": new_task, "new": True})
+        return new_task
+
+    def update_task(self, task_id, changes):
+        """apply changes ({field: new value}) to a task and return it"""
+        task = self.store.update(task_id, changes)
+        self._persist({"op": "put", "task": task})
+        return task
+
+    def delete_task(self, task_id):
+        if task_id not in self.tasks_by_id:
+            return
+        self.store.remove(task_id)
+        self._persist({"op": "del", "id": task_id})
+
+    def list_tasks(self):
+        return list(self.tasks)
+
+    def list_page(self, limit, cursor=None, *, sort=None, reverse=False, text=None,
+                  theme=None, color=None, priority=None, done=None):
+        """
+        (page, cursor of the next page or None if it's the last one) : at most limit tasks matching the criteria
+        (see query) and containing the words of text (see search), in the order of sort_tasks(sort, reverse), by id without sort
+        cursor = what the previous page returned : the page starts after its last task, even if tasks changed meanwhile
+        only the page is sorted : its tasks are picked with a heap (O(n log limit)), by binary search without sort,
+        with a numpy partition for very big todoLists (see ColumnarTable.page)
+        """
+        if sort not in PAGE_FIELDS:
+            raise ValueError(f"unknown sort : {sort}")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        criteria = {"theme": theme, "color": color, "priority": priority, "done": done}
+        criteria = {field: value for field, value in criteria.items() if value is not None}
+        after = _read_cursor(cursor, sort, reverse) if cursor else None
+        # one more task than the page : there's a next page if it's found
+        page = None
+        if sort is not None and not text:
+            page = self._columnar_page(sort, reverse, limit + 1, after, criteria)
+        if page is None:
+            if text:
+                tasks = self.store.search(text, **criteria)
+            elif criteria:
+                tasks = self.store.query(**criteria)
+            else:
+                tasks = self.store.tasks
+            if sort is None:
+                # the tasks are ordered by id : the page is a slice
+                if reverse:
+                    end = len(tasks) if after is None else bisect.bisect_left(tasks, after.id, key=attrgetter("id"))
+                    page = tasks[max(end - limit - 1, 0):end][::-1]
+                else:
+                    start = 0 if after is None else bisect.bisect_right(tasks, after.id, key=attrgetter("id"))
+                    page = tasks[start:start + limit + 1]
+            else:
+                keyed = _page_keys(tasks, sort, reverse)
+                if after is not None:
+                    (position, _), = _page_keys([after], sort, reverse)
+                    # generators : the (key, task) pairs are never all in memory at once
+                    if reverse:
+                        keyed = (entry for entry in keyed if entry[0] < position)
+                    else:
+                        keyed = (entry for entry in keyed if entry[0] > position)
+                # the (key, id) are all different : the tasks themselves are never compared
+                page = [task for _, task in (heapq.nlargest if reverse else heapq.nsmallest)(limit + 1, keyed)]
+        if len(page) <= limit:
+            return page, None
+        return page[:limit], page_cursor(page[limit - 1], sort, reverse)
+
+    def import_json(self, json_path):
+        """
+        add (or replace, same id) the tasks of a JSON todoList to this one
+        return the number of imported tasks
+        """
+        tasks = self._read_snapshot(json_path)
+        for task in tasks:
+            self.store.put(task)
+        records = [{"op": "put", "task": task} for task in tasks]
+        if self._batch is not None:
+            self._batch.update((task.id, record) for task, record in zip(tasks, records))
+        else:
+            self._persist_many(records)
+        return len(tasks)
+
+    def export(self, path):
+        """
+        write every task to path, in the format of its extension (.json, .jsonl, .tdb or .db), replacing what it contains
+        return the number of tasks written
+        ex : TodoList("ToDoList.json").export("ToDoList.tdb")
+        """
+        target = TodoList(path, load=False)
+        target._save(self.tasks)
+        return len(self.tasks)
+
+    def query(self, *, theme=None, color=None, priority=None, done=None):
+        """
+        tasks matching every given criterion (None = any value), ordered by id
+        ex : query(theme="school", done=False) -> the undone school tasks
+        uses the indexes of the store : the cost depends on the number of matching tasks, not on the size of the todoList
+        """
+        criteria = {"theme": theme, "color": color, "priority": priority, "done": done}
+        return self.store.query(**{field: value for field, value in criteria.items() if value is not None})
+
+    def search(self, text, *, theme=None, color=None, priority=None, done=None):
+        """
+        tasks containing every word of text, ordered by id, with the same optional criteria as query()
+        words are matched from their start and without accents : search("ethi") finds "Éthique"
+        """
+        criteria = {"theme": theme, "color": color, "priority": priority, "done": done}
+        return self.store.search(text, **{field: value for field, value in criteria.items() if value is not None})
+
+    def find(self, text, *, max_errors=0, theme=None, color=None, priority=None, done=None):
+        """
+        tasks containing every fragment of text anywhere in their text, even in the middle of a word,
+        with at most max_errors typos per fragment : find("thiq") and find("etique", max_errors=1) find "Éthique"
+        ranked (fewest typos first), with the same optional criteria as query()
+        """
+        criteria = {"theme": theme, "color": color, "priority": priority, "done": done}
+        return self.store.find(text, max_errors, **{field: value for field, value in criteria.items() if value is not None})
+
+    def overdue(self):
+        """undone tasks whose deadline is passed, ordered by deadline"""
+        return self.store.deadlines_between(end=date.today() - timedelta(days=1))
+
+    def due_today(self):
+        return self.store.deadlines_between(date.today(), date.today())
+
+    def due_within(self, days: int):
+        """undone tasks due between today and today + days (included)"""
+        return self.store.deadlines_between(date.today(), date.today() + timedelta(days=days))
+
+    def _columnar_table(self):
+        """
+        numpy table of every task, kept until the next change
+        (building one costs more than a sort or a filter in python, so it's only worth it for the whole todoList)
+        None if numpy isn't installed, if there are too few tasks for it to be worth it, or if the table can't be built
+        """
+        if np is None or len(self.tasks) < COLUMNAR_THRESHOLD:
+            return None
+        try:
+            store, version, table = self._columnar
+            if store is not self.store or version != self.store.version:
+                table = ColumnarTable(self.tasks)
+                self._columnar = (self.store, self.store.version, table)
+            return table
+        except (ValueError, TypeError, OverflowError):
+            return None
+
+    def bulk_update(self, changes, **filters):
+        """
+        apply changes ({field: new value}) to every task matching filters, written once (see TaskStore.select for the filters :
+        theme, color, priority, done, deadline_from, deadline_to, text)
+        ex : bulk_update({"done": True}, theme="school", deadline_to=date.today())
+        return the number of tasks really changed
+        """
+        unknown = set(changes) - set(Task.FIELDS[1:])
+        if unknown:
+            raise ValueError(f"unknown task fields : {', '.join(sorted(unknown))}")
+        changed = 0
+        with self.batch():
+            for task in self.store.select(**filters):
+                task_changes = {field: value for field, value in changes.items() if getattr(task, field) != value}
+                if task_changes:
+                    self.update_task(task.id, task_changes)
+                    changed += 1
+        return changed
+
+    def bulk_delete(self, **filters):
+        """delete every task matching filters (same as bulk_update), written once, return the number of deleted tasks"""
+        with self.batch():
+            tasks = self.store.select(**filters)
+            for task in tasks:
+                self.delete_task(task.id)
+        return len(tasks)
+
+    def _columnar_page(self, sort, reverse, limit, after, criteria):
+        """ColumnarTable.page on the numpy table of every task, None if there's no table or it can't do this sort"""
+        table = self._columnar_table()
+        if table is None:
+            return None
+        return table.page(sort, reverse, limit, after, **criteria)
+
+    def sort_tasks(self, tasks, mode, reverse=False):
+        """
+        by date (addition/deadline) (most recent at the bottom/closest deadline at the bottom)
+        by status
+        by alphabetical order
+        priority
+        reverse=True : the other way round (the window shows the highest priorities first), ties keep their order
+        tasks=None sorts the whole todoList (with numpy if it's very big), always the tasks in memory : with a SQLite
+        database, the rows another program added since the last refresh() aren't there
+        """
+        if tasks is None:
+            table = self._columnar_table()
+            if table is not None:
+                result = table.sort(mode, reverse)
+                if result is not None:
+                    return result
+            tasks = self.list_tasks()
+        if not isinstance(tasks, list):
+            return []
+        if mode in SORT_KEYS:
+            return sorted(tasks, key=SORT_KEYS[mode], reverse=reverse)
+        elif mode == "statut":
+            done_tasks = [t for t in tasks if t.done]
+            not_done_tasks = [t for t in tasks if not t.done]
+            return not_done_tasks + done_tasks if reverse else done_tasks + not_done_tasks
+        return []
+
+    @staticmethod
+    def filter_criteria(mode, category=None, color=None, priority=None):
+        """criteria of TaskStore.query for a filter mode, None if the mode is unknown or its value is missing"""
+        match mode:
+            case "done":
+                return {"done": True}
+            case "not_done":
+                return {"done": False}
+            case "category" if category is not None:
+                return {"theme": category}
+            case "color" if color is not None:
+                return {"color": color}
+            case "priority" if priority is not None:
+                return {"priority": priority}
+        return None
+
+    def filter_tasks(self, tasks, mode, category=None, color=None, priority=None):
+        """
+        filter by
+            status
+            category
+            color
+            priority
+        tasks=None filters the whole todoList with the indexes (see query)
+        """
+        if tasks is None:
+            criteria = self.filter_criteria(mode, category, color, priority)
+            if criteria is None:
+                return []
+            return self.store.query(**criteria)
+        if not isinstance(tasks, list):
+            return []
+        match mode:
+            case "done":
+                return [task for task in tasks if task.done]
+            case "not_done":
+                return [task for task in tasks if not task.done]
+            case "category":
+                return [task for task in tasks if task.theme == category]
+            case "color":
+                return [task for task in tasks if task.color == color]
+            case "priority":
+                return [task for task in tasks if task.priority == priority]
+        return []
+
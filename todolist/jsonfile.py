@@ -0,0 +1,192 @@
+"""
+The JSON todoList file {"tasks": [...]} : read task by task (the whole document is never in memory), and written
+"""
+import codecs
+import itertools
+import json
+import os
+import re
+
+JSON_CHUNK_SIZE = 64 * 1024            # the JSON file is read by chunks of this size (bytes)
+JSON_TASK_CHUNK = 512                  # first read for a single task (lazy texts), doubled until the task fits
+NOT_SPACE_RE = re.compile(r"[^ \t\n\r]")
+COMMA_RE = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")      # between two values of a list
+JSON_WRITE_CHUNK = 1000               # tasks encoded at once when the JSON file is written
+# encodes task dicts with the separators of json.dump(indent=4) at their nesting level, but with the C encoder
+_TASK_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",\n" + " " * 12, ": "))
+_NESTED_TYPES = frozenset((dict, list, tuple))
+
+
+def _file_state(path):
+    """(inode, modification time, size) of a file, None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class _JsonStream:
+    """
+    Reads the values of a JSON file one by one, by chunks of JSON_CHUNK_SIZE bytes, so a big file is never in memory
+    offset = position (in bytes) of the next value, kept only if track_offsets (it costs an encode per non-ascii value)
+    chunk_size = size of the first read, doubled at each read up to JSON_CHUNK_SIZE (small for a single task)
+    """
+
+    def __init__(self, f, track_offsets=False, chunk_size=JSON_CHUNK_SIZE):
+        self.f = f
+        self.track_offsets = track_offsets
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()     # a letter can be cut between two chunks
+        self.json = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.offset = f.tell()
+        self.eof = False
+
+    def _fill(self):
+        """reads one more chunk, False at the end of the file"""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        self.chunk_size = min(self.chunk_size * 2, JSON_CHUNK_SIZE)
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def _advance(self, end):
+        if self.track_offsets:
+            text = self.buffer[self.pos:end]
+            self.offset += len(text) if text.isascii() else len(text.encode("utf-8"))
+        self.pos = end
+
+    def peek(self):
+        """next character that isn't a space, "" at the end of the file"""
+        while True:
+            match = NOT_SPACE_RE.search(self.buffer, self.pos)
+            if match:
+                self._advance(match.start())
+                return self.buffer[self.pos]
+            self._advance(len(self.buffer))
+            if not self._fill():
+                return ""
+
+    def take(self, char):
+        """reads the expected character (ex : "," or "["), ValueError if it's something else"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r}, found {found or 'the end of the file'!r} at byte {self.offset}")
+        self._advance(self.pos + 1)
+
+    def value(self):
+        """(offset, value) of the next JSON value (a task, a key...), only this value is decoded"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.eof:     # a number could continue in the next chunk
+                    break
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+        offset = self.offset
+        self._advance(end)
+        return offset, value
+
+    def reaches(self, offset):
+        """True if the value at byte offset comes next, after a "," : the next task in the list (needs track_offsets)"""
+        if self.offset < offset:
+            match = COMMA_RE.match(self.buffer, self.pos)
+            if match and match.end() < len(self.buffer):       # else the spaces may go on in the next chunk
+                self._advance(match.end())
+            elif self.peek() == ",":
+                self._advance(self.pos + 1)
+                self.peek()
+        return self.offset == offset
+
+
+def iter_json_tasks(path, offsets=False):
+    """
+    yield the tasks (dicts) of a JSON todoList {"tasks": [...]} one at a time, or (byte offset, dict) if offsets
+    the file is read by chunks : memory holds one chunk and one task, not the whole document like json.load
+    raise ValueError if the file isn't a todoList or is damaged
+    """
+    with open(path, "rb") as f:
+        stream = _JsonStream(f, track_offsets=offsets)
+        stream.take("{")
+        if stream.peek() == "}":
+            stream.take("}")
+        else:
+            while True:
+                _, key = stream.value()
+                if not isinstance(key, str):
+                    raise ValueError(f"{path} is not a todoList")
+                stream.take(":")
+                if key != "tasks":
+                    stream.value()      # other keys are read and ignored
+                elif stream.peek() != "[":
+                    raise ValueError(f"{path} is not a todoList")
+                else:
+                    stream.take("[")
+                    if stream.peek() == "]":
+                        stream.take("]")
+                    else:
+                        while True:
+                            offset, task = stream.value()
+                            yield (offset, task) if offsets else task
+                            if stream.peek() == "]":
+                                stream.take("]")
+                                break
+                            stream.take(",")
+                if stream.peek() == "}":
+                    stream.take("}")
+                    break
+                stream.take(",")
+        if stream.peek() != "":
+            raise ValueError(f"{path} has data after the todoList")
+
+
+def read_json_task_at(path, offset):
+    """the task (dict) starting at byte offset of a JSON file"""
+    return next(read_json_tasks_at(path, [offset]))
+
+
+def read_json_tasks_at(path, offsets):
+    """
+    yield the tasks (dicts) starting at each byte offset of a JSON file, in the order of offsets
+    the file is opened once, tasks that follow each other are read in one go (sort the offsets),
+    a jump reads from JSON_TASK_CHUNK bytes, not a whole JSON_CHUNK_SIZE chunk for one task
+    """
+    with open(path, "rb") as f:
+        stream = None
+        for offset in offsets:
+            if stream is None or not stream.reaches(offset):
+                f.seek(offset)
+                stream = _JsonStream(f, track_offsets=True, chunk_size=JSON_TASK_CHUNK)
+            yield stream.value()[1]
+
+
+def write_json_tasks(f, tasks):
+    """
+    write tasks to the text file f, exactly like json.dump({"tasks": [task dicts]}, f, ensure_ascii=False, indent=4)
+    json.dump with an indent runs the pure python encoder : here the C encoder writes JSON_WRITE_CHUNK tasks at a time
+    with the separators of indent=4, then only the lines between two tasks are fixed (a raw newline is always a
+    separator, strings never contain one). Tasks holding lists or objects go through json.dumps.
+    """
+    encode = _TASK_ENCODER.encode
+    between_tasks = "},\n" + " " * 12 + "{"
+    separator = "\n"
+    f.write('{\n    "tasks": [')
+    tasks = iter(tasks)
+    while chunk := [task.to_dict() for task in itertools.islice(tasks, JSON_WRITE_CHUNK)]:
+        values = itertools.chain.from_iterable(data.values() for data in chunk)
+        if _NESTED_TYPES.isdisjoint(map(type, values)):
+            text = encode(chunk)[2:-2].replace(between_tasks, "\n        },\n        {\n            ")
+            f.write(separator + "        {\n            " + text + "\n        }")
+        else:
+            f.write(separator + ",\n".join(" " * 8 + json.dumps(data, ensure_ascii=False, indent=4).replace("\n", "\n        ")
+                                           for data in chunk))
+        separator = ",\n"
+    f.write("]\n}" if separator == "\n" else "\n    ]\n}")
@@ -0,0 +1,79 @@
+"""
+FileLock : advisory lock between the programs using the same todoList (flock on POSIX, msvcrt on Windows)
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"                  # the lock is taken on ToDoList.json.lock, the JSON file is replaced by each save
+
+
+class FileLock:
+    """
+    with lock: ... -> only one program at a time runs the block on this todoList, the others wait for it
+    Reentrant (a save inside a write takes it again) and shared by the threads of a program (the window)
+    If the lock file can't be created (read-only folder), the block runs without lock
+    """
+
+    def __init__(self, file_path):
+        self.path = file_path + LOCK_SUFFIX
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def _acquire(self):
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except OSError:
+            return None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)     # gives up after 10 seconds : tried again
+                        break
+                    except OSError:
+                        pass
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def _release(self, fd):
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = self._acquire()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                fd, self._fd = self._fd, None
+                self._release(fd)
+        finally:
+            self._thread_lock.release()
@@ -0,0 +1,202 @@
+"""
+Text indexes of the tasks : word search (TextIndex) and search by parts of words with typos (TrigramIndex)
+"""
+import bisect
+import functools
+import re
+import unicodedata
+
+WORD_RE = re.compile(r"\w+")
+
+def fold_text(text):
+    """lowercase and without accents : "Éthique" -> "ethique" """
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+fold = functools.lru_cache(maxsize=65536)(fold_text)   # for words, which come back in many tasks
+
+def tokenize(text):
+    """distinct folded words of a text"""
+    if not isinstance(text, str):
+        return set()
+    if text.isascii():     # nothing to unaccent, lower() is enough
+        return set(WORD_RE.findall(text.lower()))
+    return set(map(fold, WORD_RE.findall(text)))
+
+
+class TextIndex:
+    """
+    Inverted index of the words of the tasks (text and theme), accent and case insensitive
+        postings = {word: {ids}}
+        words = the same words, ordered, to find every word starting with a prefix by binary search
+        words_by_id = {id: words of the task}, to unindex a task without reading its old text
+    """
+    FIELDS = ("text", "theme")
+
+    def __init__(self, tasks=()):
+        self.postings = {}
+        self.words_by_id = {}
+        for task in tasks:
+            self._add_postings(task)
+        self.words = sorted(self.postings)
+
+    def _words(self, task):
+        words = set()
+        for field in self.FIELDS:
+            words |= tokenize(getattr(task, field))
+        return words
+
+    def _add_postings(self, task):
+        words = self._words(task)
+        self.words_by_id[task.id] = words
+        new_words = []
+        for word in words:
+            ids = self.postings.get(word)
+            if ids is None:
+                self.postings[word] = ids = set()
+                new_words.append(word)
+            ids.add(task.id)
+        return new_words
+
+    def add(self, task):
+        for word in self._add_postings(task):
+            bisect.insort(self.words, word)
+
+    def remove(self, task_id):
+        for word in self.words_by_id.pop(task_id, ()):
+            ids = self.postings[word]
+            ids.discard(task_id)
+            if not ids:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+
+    def _prefix_ids(self, prefix):
+        """ids of the tasks having a word starting with prefix"""
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + "\U0010ffff", start)
+        if end - start == 1:
+            return self.postings[self.words[start]]
+        ids = set()
+        for word in self.words[start:end]:
+            ids |= self.postings[word]
+        return ids
+
+    def search(self, text):
+        """
+        ids of the tasks where every word of text starts a word of the task (multi-word AND, prefix matching)
+        None if text has no word
+        """
+        prefixes = tokenize(text)
+        if not prefixes:
+            return None
+        id_sets = sorted((self._prefix_ids(prefix) for prefix in prefixes), key=len)
+        return id_sets[0].intersection(*id_sets[1:])
+
+
+def substring_distance(pattern, text, limit):
+    """
+    smallest edit distance between pattern and a part of text, None if it's above limit
+    Myers' bit-vector algorithm : the column of the distance matrix is kept as bits of two ints,
+    so each letter of text costs a few int operations instead of a loop over pattern
+    """
+    peq = {}    # letter -> bits of its positions in pattern
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << len(pattern)) - 1
+    last = 1 << (len(pattern) - 1)
+    pv, mv = mask, 0                # +1 / -1 vertical differences of the column
+    score = best = len(pattern)
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) & mask       # no carry in : the match can start anywhere in text
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+    return best if best <= limit else None
+
+
+class TrigramIndex(TextIndex):
+    """
+    Index of the trigrams (3 letters in a row) of the folded text of the tasks, to find any part of a word
+    Same structure as TextIndex, the "words" are the trigrams : the text is padded with 2 spaces so that
+    every letter starts a trigram, so a fragment of 1 or 2 letters is a prefix of trigrams
+        texts = {id: folded text}, to check the candidates given by the trigrams
+    """
+    FIELDS = ("text",)
+
+    def __init__(self, tasks=()):
+        self.texts = {}
+        super().__init__(tasks)
+
+    def _words(self, task):
+        text = fold_text(task.text) if isinstance(task.text, str) else ""
+        self.texts[task.id] = text
+        padded = text + "  "
+        return {padded[i:i + 3] for i in range(len(text))}
+
+    def remove(self, task_id):
+        super().remove(task_id)
+        self.texts.pop(task_id, None)
+
+    def _candidates(self, fragment, max_errors):
+        """(ids of the tasks which may contain fragment, errors allowed for it)"""
+        if len(fragment) < 3:
+            return self._prefix_ids(fragment), 0
+        trigrams = {fragment[i:i + 3] for i in range(len(fragment) - 2)}
+        # each error removes at most 3 trigrams, the tasks sharing fewer trigrams can't match
+        max_errors = min(max_errors, (len(trigrams) - 1) // 3)
+        if max_errors == 0:
+            id_sets = sorted((self.postings.get(trigram, set()) for trigram in trigrams), key=len)
+            return id_sets[0].intersection(*id_sets[1:]), 0
+        needed = len(trigrams) - 3 * max_errors
+        hits = {}
+        for trigram in trigrams:
+            for task_id in self.postings.get(trigram, ()):
+                hits[task_id] = hits.get(task_id, 0) + 1
+        return {task_id for task_id, count in hits.items() if count >= needed}, max_errors
+
+    def find(self, text, max_errors=0):
+        """
+        {id: number of errors} of the tasks containing every fragment of text (split on spaces)
+        anywhere in their text, with at most max_errors errors (edits) per fragment, None if text is empty
+        typos are only allowed in fragments long enough for the trigrams to still select the tasks
+        (6 letters for 1 error, 9 for 2...)
+        """
+        fragments = fold_text(text).split() if isinstance(text, str) else []
+        if not fragments:
+            return None
+        # the candidates of every fragment are intersected first, only the remaining texts are read
+        candidates = None
+        allowed = []
+        for fragment in sorted(set(fragments), key=len, reverse=True):
+            ids, errors = self._candidates(fragment, max_errors)
+            candidates = ids if candidates is None else candidates & ids
+            allowed.append((fragment, errors))
+            if not candidates:
+                return {}
+        result = {}
+        for task_id in candidates:
+            text = self.texts[task_id]
+            total = 0
+            for fragment, errors in allowed:
+                if fragment in text:
+                    continue
+                distance = substring_distance(fragment, text, errors) if errors else None
+                if distance is None:
+                    break
+                total += distance
+            else:
+                result[task_id] = total
+        return result
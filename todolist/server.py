@@ -0,0 +1,375 @@
+"""
+TodoServer : a local HTTP/JSON API over a TodoList, to drive the todoList from other programs
+
+    python ToDo-List.py --serve [port]
+
+    GET    /tasks                  one page of the tasks, ?offset=0&limit=100 (at most PAGE_MAX)
+                                   filters : done=true/false, theme, color, priority
+                                   search : search=words, or find=parts of words (with errors=typos allowed)
+                                   sort : sort=date_added/deadline/priority/alphabetically/statut, reverse=true
+                                   "next" of the answer : cursor=next gives the following page, without offset
+    GET    /tasks/<id>
+    POST   /tasks                  {"text": ..., "theme", "deadline": "dd-mm-yyyy", "priority", "color", "done"}
+    PATCH  /tasks/<id>             {field: new value}
+    POST   /tasks/<id>/toggle      done <-> not done
+    DELETE /tasks/<id>
+
+A task is answered as the dict of the JSON file, an error as {"error": message}
+"""
+import asyncio
+import http
+import json
+import sqlite3
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from .engine import SORT_KEYS, TodoList, apply_records, diff_tasks, page_cursor
+from .task import Task, parse_date
+from .watch import WATCH_POLL_S
+
+SERVER_HOST = "127.0.0.1"              # only the programs of this computer can connect
+SERVER_PORT = 8765
+PAGE_SIZE = 100                        # tasks per page when the request doesn't say
+PAGE_MAX = 1000                        # biggest page, so a big todoList never makes a huge answer
+BODY_MAX = 1024 * 1024                 # bytes, bigger request bodies are refused
+RESULT_CACHE_SIZE = 32                 # filter/sort/search results kept for the next pages, least recently used dropped first
+# fields a request can set, with their type in JSON (the deadline is a dd-mm-yyyy string, "" = no deadline)
+FIELD_TYPES = {"text": str, "theme": str, "color": str, "priority": int, "done": bool, "deadline": str}
+TYPE_WORDS = {str: "a string", int: "a number", bool: "true or false"}     # for the errors : "priority must be a number"
+SORT_MODES = (*SORT_KEYS, "statut")
+
+
+def _task_changes(data):
+    """{field: value} of a request body, as in a Task, raise ValueError if a field is unknown or has the wrong type"""
+    if not isinstance(data, dict):
+        raise ValueError("the body must be a JSON object")
+    changes = {}
+    for field, value in data.items():
+        expected = FIELD_TYPES.get(field)
+        if expected is None:
+            raise ValueError(f"unknown field : {field}")
+        if field == "deadline":
+            if value not in ("", None):
+                value = parse_date(value) if isinstance(value, str) else None
+                if value is None:
+                    raise ValueError("deadline must be a dd-mm-yyyy date")
+            value = value or None
+        elif type(value) is not expected:      # type() : True isn't a priority
+            raise ValueError(f"{field} must be {TYPE_WORDS[expected]}")
+        elif field == "priority" and not 0 <= value <= 5:
+            raise ValueError("priority must be between 0 and 5")
+        changes[field] = value
+    return changes
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _bool_param(params, name):
+    value = params[name].lower()
+    if value not in ("true", "false"):
+        raise ValueError(f"{name} must be true or false")
+    return value == "true"
+
+
+def _criteria_params(params):
+    """the filters of params, as the field=value criteria of TaskStore.query"""
+    criteria = {}
+    if "done" in params:
+        criteria["done"] = _bool_param(params, "done")
+    for field in ("theme", "color"):
+        if field in params:
+            criteria[field] = params[field]
+    if "priority" in params:
+        criteria["priority"] = _int_param(params, "priority", 0)
+    return criteria
+
+
+def _sort_params(params):
+    """sort mode (None = order of the ids) and reverse of params, reverse is only used with a sort"""
+    sort = params.get("sort") or None
+    if sort is None:
+        return None, False
+    if sort not in SORT_MODES:
+        raise ValueError(f"sort must be one of {', '.join(SORT_MODES)}")
+    return sort, "reverse" in params and _bool_param(params, "reverse")
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n")
+    if not keep_alive:
+        head += "Connection: close\r\n"
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+class TodoServer:
+    """
+    The requests are read and answered in one asyncio loop, which owns todo.store : the readings never wait for a lock
+    The changes go through one writer task (see _write_loop) which applies them one after the other, then writes
+    everything it got meanwhile at once (one append to the journal, one transaction...) in its file thread
+    A change is answered once it's written
+    """
+
+    def __init__(self, todo):
+        self.todo = todo
+        self._jobs = asyncio.Queue()        # (function, args, future) of the changes waiting for the writer
+        # the files are written out of the loop, by one thread (so one write at a time, in order)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-files")
+        self._result_cache = OrderedDict()  # (request parameters, store version) -> tasks, for the next pages
+        self._writer = None
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        """listen on host:port and start the writer task, return the asyncio server"""
+        self._writer = asyncio.create_task(self._write_loop())
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    async def serve_forever(self, host=SERVER_HOST, port=SERVER_PORT):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    # --- HTTP ---
+
+    async def _handle_client(self, reader, writer):
+        """one connection : its requests one after the other (keep-alive), until it's closed"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.split(" ")
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    writer.write(_response(400, {"error": "malformed request"}, False))
+                    break
+                if length > BODY_MAX:
+                    writer.write(_response(413, {"error": f"the body is bigger than {BODY_MAX} bytes"}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                status, payload = await self._dispatch(method, target, body)
+                writer.write(_response(status, payload, keep_alive))
+                if not keep_alive:
+                    break
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        """(status, JSON answer) of a request"""
+        url = urllib.parse.urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if not parts or parts[0] != "tasks" or len(parts) > 3 or len(parts) == 3 and parts[2] != "toggle":
+            return 404, {"error": f"unknown path : {url.path}"}
+        try:
+            if len(parts) == 1:
+                if method == "GET":
+                    return 200, self._list(dict(urllib.parse.parse_qsl(url.query)))
+                if method == "POST":
+                    return 201, (await self._change(self._add, json.loads(body or b"{}")))[0]["task"].to_dict()
+                return 405, {"error": f"{method} not allowed on /tasks"}
+            try:
+                task_id = int(parts[1])
+            except ValueError:
+                return 404, {"error": f"no task with the id {parts[1]}"}
+            if len(parts) == 3:
+                if method != "POST":
+                    return 405, {"error": f"{method} not allowed on {url.path}"}
+                return 200, (await self._change(self._toggle, task_id))[0]["task"].to_dict()
+            match method:
+                case "GET":
+                    return 200, self._task(task_id).to_dict()
+                case "PATCH":
+                    return 200, (await self._change(self._update, task_id, json.loads(body or b"{}")))[0]["task"].to_dict()
+                case "DELETE":
+                    await self._change(self._delete, task_id)
+                    return 200, {"deleted": task_id}
+            return 405, {"error": f"{method} not allowed on {url.path}"}
+        except KeyError as e:
+            return 404, {"error": f"no task with the id {e.args[0]}"}
+        except (ValueError, TypeError) as e:        # json.JSONDecodeError too
+            return 400, {"error": str(e)}
+        except (OSError, sqlite3.Error) as e:
+            return 500, {"error": f"the change couldn't be saved : {e}"}
+
+    # --- readings (in the loop, on the store as it is) ---
+
+    def _task(self, task_id):
+        task = self.todo.store.by_id.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def _list(self, params):
+        """a page of the tasks matching the filters/search of params, sorted"""
+        offset = max(_int_param(params, "offset", 0), 0)
+        limit = min(max(_int_param(params, "limit", PAGE_SIZE), 0), PAGE_MAX)
+        if "cursor" in params:
+            return self._list_after(params["cursor"], max(limit, 1), params)
+        query = {name: value for name, value in params.items() if name not in ("offset", "limit")}
+        key = (tuple(sorted(query.items())), self.todo.store.version)
+        tasks = self._result_cache.get(key)
+        if tasks is not None:
+            self._result_cache.move_to_end(key)
+        else:
+            tasks = self._select(query)
+            # results of an older version can't be asked again
+            if self._result_cache and next(reversed(self._result_cache))[-1] != self.todo.store.version:
+                self._result_cache.clear()
+            self._result_cache[key] = tasks
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        answer = {"total": len(tasks), "offset": offset, "limit": limit,
+                  "tasks": [task.to_dict() for task in tasks[offset:offset + limit]]}
+        if 0 < limit and offset + limit < len(tasks) and not params.get("find"):
+            answer["next"] = page_cursor(tasks[offset + limit - 1], *_sort_params(params))
+        return answer
+
+    def _list_after(self, cursor, limit, params):
+        """
+        the page after the cursor : only this page is picked and sorted (TodoList.list_page), nothing is cached
+        the answer has no total, "next" is null on the last page
+        """
+        if params.get("find"):
+            raise ValueError("the results of find are ranked : use offset to page them")
+        sort, reverse = _sort_params(params)
+        page, next_cursor = self.todo.list_page(limit, cursor, sort=sort, reverse=reverse,
+                                                text=params.get("search"), **_criteria_params(params))
+        return {"limit": limit, "tasks": [task.to_dict() for task in page], "next": next_cursor}
+
+    def _select(self, params):
+        """every task matching params, in the asked order"""
+        store = self.todo.store
+        criteria = _criteria_params(params)
+        if params.get("find"):
+            tasks = store.find(params["find"], _int_param(params, "errors", 0), **criteria)
+        elif params.get("search"):
+            tasks = store.search(params["search"], **criteria)
+        elif criteria:
+            tasks = store.query(**criteria)
+        else:
+            tasks = None        # the whole todoList : sort_tasks can use numpy
+        sort, reverse = _sort_params(params)
+        if sort:
+            return self.todo.sort_tasks(tasks, sort, reverse)
+        return store.query() if tasks is None else tasks
+
+    # --- changes (applied by the writer task only) ---
+
+    async def _change(self, function, *args):
+        """function(*args) is run by the writer task, return its records once they are written"""
+        future = asyncio.get_running_loop().create_future()
+        await self._jobs.put((function, args, future))
+        return await future
+
+    # each change returns its records (see apply_records), the tasks in them are copies :
+    # a new task can be renumbered by a merge in the file thread (see TodoList.write_changes)
+
+    def _add(self, data):
+        changes = _task_changes(data)
+        if not isinstance(changes.get("text"), str) or not changes["text"].strip():
+            raise ValueError("text is required")
+        task = Task(self.todo.store.new_id(), date=date.today(), **changes)
+        self.todo.store.add(task)
+        return [{"op": "put", "task": task.copy(), "new": True}]
+
+    def _update(self, task_id, data):
+        changes = _task_changes(data)
+        self._task(task_id)
+        return [{"op": "put", "task": self.todo.store.update(task_id, changes).copy()}]
+
+    def _toggle(self, task_id):
+        task = self._task(task_id)
+        return [{"op": "put", "task": self.todo.store.update(task_id, {"done": not task.done}).copy()}]
+
+    def _delete(self, task_id):
+        self._task(task_id)
+        self.todo.store.remove(task_id)
+        return [{"op": "del", "id": task_id}]
+
+    async def _write_loop(self):
+        """the writer task : applies the changes in the order they came, writes them by groups"""
+        while True:
+            try:
+                jobs = [await asyncio.wait_for(self._jobs.get(), WATCH_POLL_S)]
+            except asyncio.TimeoutError:        # nothing to write : time to look at the changes of other programs
+                await self._read_changes()
+                continue
+            while not self._jobs.empty():       # everything that came during the last write goes in this one
+                jobs.append(self._jobs.get_nowait())
+            store = self.todo.store
+            store.undo_log = []     # a failed write takes back the changes of its jobs (see TaskStore.rollback)
+            records = []
+            applied = []
+            for function, args, future in jobs:
+                try:
+                    job_records = function(*args)
+                except (KeyError, ValueError, TypeError) as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                    continue
+                records += job_records
+                applied.append((future, job_records))
+            try:
+                await self._write(records)
+            except (OSError, sqlite3.Error) as e:
+                store.rollback()        # the tasks in memory stay like the file : nothing of these changes was saved
+                for future, _ in applied:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                continue
+            store.undo_log = None
+            for future, job_records in applied:
+                if not future.cancelled():
+                    future.set_result(job_records)
+
+    async def _write(self, records):
+        if not records:
+            return
+        # nothing changes the tasks until the write is done (only the writer does) : the list doesn't need a copy
+        tasks = list(self.todo.tasks) if self.todo.rewrite_needed() else None
+        merged = await asyncio.get_running_loop().run_in_executor(self._executor, self.todo.write_changes, records, tasks)
+        if merged is not None:      # another program changed the file : its changes are brought in
+            apply_records(self.todo.store, diff_tasks(self.todo.store, merged.tasks))
+
+    async def _read_changes(self):
+        changes = await asyncio.get_running_loop().run_in_executor(self._executor, self._read_file_changes)
+        if changes is not None:
+            records, tasks = changes
+            apply_records(self.todo.store, diff_tasks(self.todo.store, tasks) if records is None else records)
+
+    def _read_file_changes(self):
+        """in the file thread : (records appended by other programs, or None and every task), None if nothing changed"""
+        if not self.todo.changed_on_disk():
+            return None
+        records = self.todo.read_appended()
+        return records, self.todo.read_store().tasks if records is None else None
+
+
+def serve(file_path="ToDoList.json", host=SERVER_HOST, port=SERVER_PORT, **options):
+    """load the todoList (options : see TodoList) and answer its requests until Ctrl+C"""
+    todo = TodoList(file_path, **options)
+    try:
+        asyncio.run(TodoServer(todo).serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,280 @@
+"""
+The other formats of a todoList : SQLite database (.db), JSON Lines (.jsonl) and binary (.tdb)
+"""
+import json
+import os
+import sqlite3
+import struct
+from datetime import date
+
+from .task import Task, is_task_dict
+
+TMP_SUFFIX = ".tmp"                    # the new version is written there, then renamed over the file
+JSONL_SUFFIX = ".jsonl"                # JSON Lines todoList : one task per line, changes are appended
+JSONL_COMPACT_MIN = 1000               # a JSON Lines file is rewritten once it has this many more lines than tasks...
+JSONL_COMPACT_RATIO = 2                # ...and more than twice as many lines as tasks
+BINARY_SUFFIX = ".tdb"                 # binary todoList (see write_binary_tasks), saved like the JSON file
+BINARY_MAGIC = b"TODOBIN1"
+# id, priority, done, date, deadline (ordinals, 0 = no date), byte lengths of theme, text, color and overrides
+BINARY_RECORD = struct.Struct("<qqBiiIIII")
+
+def _fsync_dir(file_path):
+    """make a rename in the folder of file_path durable (only possible on POSIX systems)"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _is_int64(value):
+    return type(value) is int and -2 ** 63 <= value < 2 ** 63
+
+
+def write_binary_tasks(f, tasks):
+    """
+    write tasks to the binary file f : BINARY_MAGIC, then for each task a BINARY_RECORD and its strings (UTF-8)
+    what doesn't fit the record (unknown keys, a priority that isn't a number...) goes in "overrides",
+    a JSON object in the dict format of the JSON file, empty for most tasks
+    """
+    f.write(BINARY_MAGIC)
+    pack = BINARY_RECORD.pack
+    for task in tasks:
+        overrides = dict(task.extra) if task.extra else {}
+        task_id, priority = task.id, task.priority
+        if not _is_int64(task_id):
+            overrides["id"], task_id = task_id, 0
+        if not _is_int64(priority):
+            overrides["priority"], priority = priority, 0
+        if type(task.done) is not bool:
+            overrides["done"] = task.done
+        ordinals = []
+        for field in ("date", "deadline"):
+            value = getattr(task, field)
+            ordinals.append(value.toordinal() if value is not None else 0)
+        strings = []
+        for field in ("theme", "text", "color"):
+            value = getattr(task, field)
+            if not isinstance(value, str):
+                overrides[field] = value
+                value = ""
+            strings.append(value.encode("utf-8"))
+        strings.append(json.dumps(overrides, ensure_ascii=False).encode("utf-8") if overrides else b"")
+        f.write(pack(task_id, priority, task.done is True, *ordinals, *map(len, strings)) + b"".join(strings))
+
+
+def iter_binary_tasks(path):
+    """yield the tasks of a binary todoList, raise ValueError if it isn't one or is damaged"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError(f"{path} is not a binary todoList")
+    view = memoryview(data)
+    pos = len(BINARY_MAGIC)
+    unpack_from = BINARY_RECORD.unpack_from
+    try:
+        while pos < len(data):
+            task_id, priority, done, day, deadline, *lengths = unpack_from(data, pos)
+            pos += BINARY_RECORD.size
+            strings = []
+            for length in lengths:
+                if pos + length > len(data):
+                    raise ValueError(f"{path} is truncated")
+                strings.append(str(view[pos:pos + length], "utf-8"))
+                pos += length
+            theme, text, color, overrides = strings
+            task = Task(task_id, text, done=bool(done), theme=theme,
+                        date=date.fromordinal(day) if day else None,
+                        deadline=date.fromordinal(deadline) if deadline else None,
+                        priority=priority, color=color)
+            if overrides:
+                data_dict = task.to_dict()
+                data_dict.update(json.loads(overrides))
+                task = Task.from_dict(data_dict)
+            yield task
+    except struct.error:
+        raise ValueError(f"{path} is truncated")
+
+
+class SqliteStorage:
+    """
+    Tasks stored in a SQLite database (one row per task) instead of a JSON file
+    Used by TodoList when the file path ends with .db
+    Every field used by the filters and the sorts has an index
+    """
+    INSERT = ("INSERT OR REPLACE INTO tasks (id, done, theme, text, date, deadline, priority, color, extra) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, file_path):
+        # used by one thread at a time, but the window opens it in its own thread and writes from its file thread
+        self.connection = sqlite3.connect(file_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                                        id INTEGER PRIMARY KEY,
+                                        done INTEGER NOT NULL DEFAULT 0,
+                                        theme TEXT NOT NULL DEFAULT 'default',
+                                        text TEXT NOT NULL DEFAULT '',
+                                        date TEXT,
+                                        deadline TEXT,
+                                        priority INTEGER NOT NULL DEFAULT 0,
+                                        color TEXT NOT NULL DEFAULT 'normal',
+                                        extra TEXT)""")
+            # databases made before the extra column : it's added, NULL for every task
+            if "extra" not in {row[1] for row in self.connection.execute("PRAGMA table_info(tasks)")}:
+                self.connection.execute("ALTER TABLE tasks ADD COLUMN extra TEXT")
+            for column in ("done", "theme", "color", "priority", "deadline"):
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS tasks_{column} ON tasks({column})")
+
+    @staticmethod
+    def _to_row(task):
+        return (task.id, bool(task.done), task.theme, task.text,
+                task.date.isoformat() if task.date else None, task.deadline.isoformat() if task.deadline else None,
+                task.priority or 0, task.color,
+                json.dumps(task.extra, ensure_ascii=False) if task.extra else None)   # unknown keys of the JSON, as JSON
+
+    def load(self):
+        """return every task, ordered by id"""
+        rows = self.connection.execute("SELECT id, done, theme, text, date, deadline, priority, color, extra "
+                                       "FROM tasks ORDER BY id")
+        return [Task(id, text, done=bool(done), theme=theme,
+                     date=date.fromisoformat(date_added) if date_added else None,
+                     deadline=date.fromisoformat(deadline) if deadline else None,
+                     priority=priority, color=color, extra=json.loads(extra) if extra else None)
+                for id, done, theme, text, date_added, deadline, priority, color, extra in rows]
+
+    def put(self, task):
+        """insert or update one task"""
+        with self.connection:
+            self.connection.execute(self.INSERT, self._to_row(task))
+
+    def put_many(self, tasks):
+        with self.connection:
+            self.connection.executemany(self.INSERT,
+                                        (self._to_row(task) for task in tasks))
+
+    def delete(self, task_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def write_many(self, tasks, deleted_ids):
+        """put tasks and delete deleted_ids in one transaction"""
+        with self.connection:
+            self.put_many(tasks)
+            self.connection.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id in deleted_ids))
+
+    def save_all(self, tasks):
+        """replace the whole table by tasks"""
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks")
+            self.put_many(tasks)
+
+    def data_version(self):
+        """number that changes each time another connection (another program) writes to the database"""
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+class JsonLinesStorage:
+    """
+    The tasks in a JSON Lines file : one task (same dict as in the JSON file) per line
+    A change appends the new version of the task (the last line of an id wins), a deletion appends
+    {"id": id, "deleted": true} : nothing is rewritten, until the file has too many old lines (see compact_needed)
+    Same methods as SqliteStorage for TodoList (load, put, put_many, delete, write_many, save_all)
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lines = 0      # lines in the file, old versions included
+        self.size = 0       # bytes of those lines : where the lines appended by another program start
+
+    @staticmethod
+    def _read_line(line):
+        """the task or deletion of a line, None if the line can't be read (damaged, not a dict, no int id : skipped)"""
+        try:
+            record = json.loads(line)
+        except ValueError:      # bad JSON or bytes that aren't utf-8
+            return None
+        return record if is_task_dict(record) else None
+
+    def load(self):
+        tasks = {}
+        self.lines = self.size = 0
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, "rb+") as f:
+            for line in f:
+                if not line.endswith(b"\n"):     # incomplete last line (crash while writing), dropped
+                    f.truncate(self.size)
+                    break
+                self.size += len(line)
+                self.lines += 1
+                record = self._read_line(line)
+                if record is None:
+                    continue
+                if record.get("deleted"):
+                    tasks.pop(record["id"], None)
+                else:
+                    tasks[record["id"]] = Task.from_dict(record)
+        return list(tasks.values())
+
+    def read_appended(self):
+        """
+        the lines added to the file (by another program) since it was read or written here,
+        as records for TodoList : {"op": "put", "task": Task} or {"op": "del", "id": id}
+        """
+        with open(self.file_path, "rb") as f:
+            f.seek(self.size)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.size += end
+        records = []
+        for line in data[:end].splitlines():
+            self.lines += 1
+            record = self._read_line(line)
+            if record is None:
+                continue
+            if record.get("deleted"):
+                records.append({"op": "del", "id": record["id"]})
+            else:
+                records.append({"op": "put", "task": Task.from_dict(record)})
+        return records
+
+    def _append(self, records):
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+            self.size = os.fstat(f.fileno()).st_size
+        self.lines += len(records)
+
+    def put(self, task):
+        self.put_many([task])
+
+    def put_many(self, tasks):
+        self._append([task.to_dict() for task in tasks])
+
+    def delete(self, task_id):
+        self.write_many([], [task_id])
+
+    def write_many(self, tasks, deleted_ids):
+        """append the new versions of tasks and the deletions of deleted_ids, with one fsync"""
+        self._append([task.to_dict() for task in tasks] + [{"id": task_id, "deleted": True} for task_id in deleted_ids])
+
+    def save_all(self, tasks):
+        """rewrite the file with only the current tasks (temporary file + rename)"""
+        tmp_path = self.file_path + TMP_SUFFIX
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for task in tasks:
+                f.write(json.dumps(task.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.size = os.fstat(f.fileno()).st_size
+        os.replace(tmp_path, self.file_path)
+        _fsync_dir(self.file_path)
+        self.lines = len(tasks)
+
+    def compact_needed(self, task_count):
+        """True if the old lines take more room than the tasks"""
+        return self.lines > max(JSONL_COMPACT_RATIO * task_count, task_count + JSONL_COMPACT_MIN)
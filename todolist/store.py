@@ -0,0 +1,334 @@
+"""
+TaskStore : the tasks in memory with their indexes, and the allocation of their ids
+"""
+import bisect
+import heapq
+from operator import attrgetter
+
+from .search import TextIndex, TrigramIndex, fold_text, tokenize
+from .task import LazyTask, Task, _intern
+
+
+class IdAllocator:
+    """
+    Give the lowest unused id in O(log n) instead of walking the whole todoList
+    free = min-heap of the ranges (first, last) of unused ids below high, high = biggest id given so far
+    (ranges, not ids : one task with a huge id, ex : 10 000 000, adds one range, not millions of ids)
+    """
+    def __init__(self, used_ids=()):
+        self.reset(used_ids)
+
+    def reset(self, used_ids):
+        self.free = []
+        self.high = 0
+        for task_id in sorted(set(used_ids)):
+            if task_id > self.high + 1:
+                self.free.append((self.high + 1, task_id - 1))      # sorted, so already a heap
+            self.high = max(self.high, task_id)
+
+    def allocate(self, used=()):
+        # ids taken with take() can still be in the ranges, they're skipped here
+        while self.free:
+            first, last = self.free[0]
+            if first < last:
+                heapq.heapreplace(self.free, (first + 1, last))
+            else:
+                heapq.heappop(self.free)
+            if first not in used:
+                return first
+        self.high += 1
+        return self.high
+
+    def take(self, task_id):
+        """an id given from outside (journal, import...)"""
+        if task_id > self.high + 1:
+            heapq.heappush(self.free, (self.high + 1, task_id - 1))
+        self.high = max(self.high, task_id)
+
+    def release(self, task_id):
+        """the id of a deleted task can be given again"""
+        heapq.heappush(self.free, (task_id, task_id))
+
+
+class TaskStore:
+    """
+    The tasks ordered by id, with every index kept up to date on each add/update/remove
+    (nothing is rebuilt after a mutation) :
+        by_id = {id: task}
+        indexes = {field: {value: {ids}}} for the fields used by the filters
+        deadlines = [(deadline, id)] of the undone tasks with a deadline, ordered, for the deadline range queries
+        text_index = words of the text and theme of each task, for the search
+        trigram_index = trigrams of the text of each task, for the search of parts of words
+        (both are only built when the first search needs them, loading doesn't read every text)
+        version = number incremented by every change, to know if something computed from the tasks is still valid
+        undo_log = None, or a list of what undoes each change since it was set (see rollback)
+    """
+    INDEXED_FIELDS = ("theme", "color", "priority", "done")
+    UPDATABLE_FIELDS = frozenset((*Task.FIELDS[1:], "extra"))     # every field but the id
+
+    def __init__(self, tasks=()):
+        self.version = 0
+        self.undo_log = None
+        self.load(tasks)
+
+    def load(self, tasks):
+        """(re)build everything from a list of tasks"""
+        self.tasks = sorted(tasks, key=lambda t: t.id)     # nearly free if they already are ordered
+        self.by_id = {t.id: t for t in self.tasks}
+        ids = [t.id for t in self.tasks]
+        self.indexes = {}
+        for field in self.INDEXED_FIELDS:      # one loop per field instead of _index() on each task
+            index = self.indexes[field] = {}
+            for value, task_id in zip(map(attrgetter(field), self.tasks), ids):
+                same_value = index.get(value)
+                if same_value is None:
+                    index[value] = {task_id}
+                else:
+                    same_value.add(task_id)
+        # sorted once, not one insort per task
+        self.deadlines = sorted((t.deadline, t.id) for t in self.tasks if t.deadline is not None and not t.done)
+        self._text_index = None       # built by the first search (it reads every text)
+        self._trigram_index = None
+        self.id_allocator = IdAllocator(self.by_id)
+        self.version += 1
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def _position(self, task_id):
+        """index of task_id in self.tasks (or where it would be inserted), by binary search"""
+        return bisect.bisect_left(self.tasks, task_id, key=lambda t: t.id)
+
+    def _index(self, task):
+        for field, index in self.indexes.items():
+            index.setdefault(getattr(task, field), set()).add(task.id)
+        self._index_deadline(task)
+
+    def _index_deadline(self, task):
+        if task.deadline is not None and not task.done:
+            bisect.insort(self.deadlines, (task.deadline, task.id))
+
+    def _unindex_deadline(self, task):
+        if task.deadline is None:
+            return
+        entry = (task.deadline, task.id)
+        i = bisect.bisect_left(self.deadlines, entry)
+        if i < len(self.deadlines) and self.deadlines[i] == entry:
+            del self.deadlines[i]
+
+    def _unindex(self, task):
+        for field, index in self.indexes.items():
+            ids = index[getattr(task, field)]
+            ids.discard(task.id)
+            if not ids:
+                del index[getattr(task, field)]
+        self._unindex_deadline(task)
+
+    def new_id(self):
+        return self.id_allocator.allocate(self.by_id)
+
+    def add(self, task):
+        self.tasks.insert(self._position(task.id), task)
+        self.by_id[task.id] = task
+        self.id_allocator.take(task.id)
+        self._index(task)
+        if self._text_index is not None:
+            self._text_index.add(task)
+        if self._trigram_index is not None:
+            self._trigram_index.add(task)
+        if self.undo_log is not None:
+            self.undo_log.append(("remove", task.id))
+        self.version += 1
+
+    def update(self, task_id, changes):
+        """
+        apply changes = {field: new value} to a task, only the indexes of the changed fields are touched
+        raise ValueError for the id (the tasks are ordered by it) or an unknown field, before anything is changed
+        """
+        if "id" in changes:
+            raise ValueError("the id of a task can't be changed")
+        unknown = changes.keys() - self.UPDATABLE_FIELDS
+        if unknown:
+            raise ValueError(f"unknown task fields : {', '.join(sorted(map(str, unknown)))}")
+        task = self.by_id[task_id]
+        if self.undo_log is not None:
+            old_values = {field: getattr(task, field) for field in changes}
+            if task.extra and not task.extra.keys().isdisjoint(changes):
+                old_values["extra"] = dict(task.extra)      # the unreadable dates dropped below come back on rollback
+            self.undo_log.append(("update", task_id, old_values))
+        deadline_changed = "done" in changes or "deadline" in changes
+        if deadline_changed:
+            self._unindex_deadline(task)
+        words_changed = self._text_index is not None and \
+            any(field in changes and changes[field] != getattr(task, field) for field in TextIndex.FIELDS)
+        if words_changed:
+            self._text_index.remove(task_id)
+        text_changed = self._trigram_index is not None and "text" in changes and changes["text"] != task.text
+        if text_changed:
+            self._trigram_index.remove(task_id)
+        for field, value in changes.items():
+            if field in Task.INTERNED:
+                value = _intern(value)
+            index = self.indexes.get(field)
+            if index is not None and getattr(task, field) != value:
+                ids = index[getattr(task, field)]
+                ids.discard(task_id)
+                if not ids:
+                    del index[getattr(task, field)]
+                index.setdefault(value, set()).add(task_id)
+            setattr(task, field, value)
+            if field in Task.DATE_FIELDS and task.extra and field in task.extra:    # an unreadable date of the file
+                del task.extra[field]
+        if deadline_changed:
+            self._index_deadline(task)
+        if words_changed:
+            self._text_index.add(task)
+        if text_changed:
+            self._trigram_index.add(task)
+        self.version += 1
+        return task
+
+    def deadlines_between(self, start=None, end=None):
+        """undone tasks with start <= deadline <= end (None = no limit), ordered by deadline, by binary search"""
+        lo = 0 if start is None else bisect.bisect_left(self.deadlines, (start,))
+        hi = len(self.deadlines) if end is None else bisect.bisect_right(self.deadlines, (end, float("inf")))
+        return [self.by_id[task_id] for _, task_id in self.deadlines[lo:hi]]
+
+    def put(self, task):
+        """add the task, or replace the one with the same id"""
+        if task.id in self.by_id:
+            self.remove(task.id, release_id=False)
+        self.add(task)
+
+    def remove(self, task_id, release_id=True):
+        task = self.by_id.pop(task_id)
+        del self.tasks[self._position(task_id)]
+        self._unindex(task)
+        if self._text_index is not None:
+            self._text_index.remove(task_id)
+        if self._trigram_index is not None:
+            self._trigram_index.remove(task_id)
+        if release_id:
+            self.id_allocator.release(task_id)
+        if self.undo_log is not None:
+            self.undo_log.append(("add", task))
+        self.version += 1
+        return task
+
+    @property
+    def text_index(self):
+        if self._text_index is None:
+            LazyTask.read_texts(self.tasks)
+            self._text_index = TextIndex(self.tasks)
+        return self._text_index
+
+    @property
+    def trigram_index(self):
+        if self._trigram_index is None:
+            LazyTask.read_texts(self.tasks)
+            self._trigram_index = TrigramIndex(self.tasks)
+        return self._trigram_index
+
+    def has_trigram_index(self):
+        """False until the first search of parts of words (or set_trigram_index) builds it"""
+        return self._trigram_index is not None
+
+    def set_trigram_index(self, index, version):
+        """
+        index = TrigramIndex built elsewhere (ex : by another thread, from a copy of the list of the tasks of version)
+        kept if nothing changed since version and there's no index yet, return True if it was
+        """
+        if version != self.version or self._trigram_index is not None:
+            return False
+        self._trigram_index = index
+        return True
+
+    def rollback(self):
+        """undo every change recorded in undo_log (newest first), then stop recording"""
+        undo_log, self.undo_log = self.undo_log or [], None
+        for action, *args in reversed(undo_log):
+            if action == "add":
+                self.add(*args)
+            elif action == "update":
+                self.update(*args)
+            else:
+                self.remove(*args)
+
+    def values(self, field):
+        """distinct values of an indexed field, without scanning the tasks"""
+        return [value for value in self.indexes[field] if value not in (None, "")]
+
+    def query(self, **criteria):
+        """
+        tasks matching every field=value of criteria (indexed fields only), ordered by id
+        the smallest set of ids is intersected with the others, so the cost follows the size of the result, not of the todoList
+        """
+        if not criteria:
+            return list(self.tasks)
+        id_sets = sorted((self.indexes[field].get(value, set()) for field, value in criteria.items()), key=len)
+        ids = id_sets[0].intersection(*id_sets[1:])
+        return [self.by_id[task_id] for task_id in sorted(ids)]
+
+    def search(self, text, **criteria):
+        """
+        tasks containing every word of text (as a word or the start of a word, accents and case ignored),
+        and matching criteria like query(), ordered by id
+        """
+        if not tokenize(text):      # no word : the text index isn't needed, it isn't built
+            return self.query(**criteria)
+        ids = self.text_index.search(text)
+        id_sets = sorted([ids, *(self.indexes[field].get(value, set()) for field, value in criteria.items())], key=len)
+        ids = id_sets[0].intersection(*id_sets[1:])
+        return [self.by_id[task_id] for task_id in sorted(ids)]
+
+    def select(self, text=None, deadline_from=None, deadline_to=None, **criteria):
+        """
+        tasks matching criteria like query(), containing the words of text like search() (None = any text)
+        and with deadline_from <= deadline <= deadline_to (dates, None = no limit), ordered by id
+        """
+        tasks = self.search(text, **criteria) if text else self.query(**criteria)
+        if deadline_from is not None or deadline_to is not None:
+            tasks = [t for t in tasks if t.deadline is not None
+                     and (deadline_from is None or deadline_from <= t.deadline)
+                     and (deadline_to is None or t.deadline <= deadline_to)]
+        return tasks
+
+    def find(self, text, max_errors=0, **criteria):
+        """
+        tasks containing every fragment of text anywhere in their text (accents and case ignored),
+        with at most max_errors typos per fragment, and matching criteria like query()
+        ranked : fewest errors first, then by id
+        """
+        if not isinstance(text, str) or not fold_text(text).split():
+            return self.query(**criteria)   # no fragment : the trigram index isn't needed, it isn't built (see trigram_index)
+        distances = self.trigram_index.find(text, max_errors)
+        if criteria:
+            id_sets = [self.indexes[field].get(value, set()) for field, value in criteria.items()]
+            distances = {task_id: errors for task_id, errors in distances.items()
+                         if all(task_id in ids for ids in id_sets)}
+        return [self.by_id[task_id] for task_id in sorted(distances, key=lambda task_id: (distances[task_id], task_id))]
+
+    def check_invariants(self):
+        """raise AssertionError if an index doesn't match the tasks (for tests)"""
+        ids = [t.id for t in self.tasks]
+        if ids != sorted(set(ids)):
+            raise AssertionError("tasks are not ordered by unique ids")
+        if self.by_id != {t.id: t for t in self.tasks}:
+            raise AssertionError("by_id doesn't match the tasks")
+        for field, index in self.indexes.items():
+            expected = {}
+            for task in self.tasks:
+                expected.setdefault(getattr(task, field), set()).add(task.id)
+            if index != expected:
+                raise AssertionError(f"index on {field} doesn't match the tasks")
+        if self.deadlines != sorted((t.deadline, t.id) for t in self.tasks if t.deadline is not None and not t.done):
+            raise AssertionError("deadline index doesn't match the tasks")
+        expected = TextIndex(self.tasks)
+        if (self.text_index.postings, self.text_index.words) != (expected.postings, expected.words):
+            raise AssertionError("text index doesn't match the tasks")
+        expected = TrigramIndex(self.tasks)
+        if (self.trigram_index.postings, self.trigram_index.words, self.trigram_index.texts) != \
+                (expected.postings, expected.words, expected.texts):
+            raise AssertionError("trigram index doesn't match the tasks")
+        if ids and self.id_allocator.high < ids[-1]:
+            raise AssertionError("the id allocator can give an id already used")
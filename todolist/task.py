@@ -0,0 +1,162 @@
+"""
+Task : one task of the todoList, and the dd-mm-yyyy dates of the JSON file
+"""
+import functools
+import sys
+from datetime import datetime
+
+from .jsonfile import _file_state, read_json_task_at, read_json_tasks_at
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(date_str):
+    """dd-mm-yyyy -> date, None if empty or invalid (cached : the same few dates come back in most tasks)"""
+    try:
+        return datetime.strptime(date_str, "%d-%m-%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def format_date(date_obj):
+    """date -> dd-mm-yyyy, "" if None"""
+    return date_obj.strftime("%d-%m-%Y") if date_obj is not None else ""
+
+def is_task_dict(data):
+    """True if data can be read as a task : a dict with an int id (type() : True isn't an id)"""
+    return isinstance(data, dict) and type(data.get("id")) is int
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Task:
+    """
+    One task of the todoList
+    __slots__ : no dict per task, date and deadline are kept parsed (date objects, None if there's no date)
+    and theme/color are interned, so every task of a theme shares the same string
+    The dicts with dd-mm-yyyy strings only exist at the JSON boundary (from_dict / to_dict)
+    """
+    __slots__ = ("id", "done", "theme", "text", "date", "deadline", "priority", "color", "extra")
+    FIELDS = ("id", "done", "theme", "text", "date", "deadline", "priority", "color")
+    INTERNED = ("theme", "color")
+    KNOWN_KEYS = frozenset(FIELDS)
+    DATE_FIELDS = ("date", "deadline")
+
+    def __init__(self, id, text="", *, done=False, theme="default", date=None, deadline=None,
+                 priority=0, color="normal", extra=None):
+        self.id = id
+        self.done = done
+        self.theme = _intern(theme)
+        self.text = text
+        self.date = date
+        self.deadline = deadline
+        self.priority = priority
+        self.color = _intern(color)
+        self.extra = extra      # keys of the JSON unknown to this version (or unreadable dates), written back as they are (None most of the time)
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.keys() <= cls.KNOWN_KEYS:      # no unknown key (nearly always) : no dict to build
+            extra = None
+        else:
+            extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        date_added = parse_date(data.get("date", ""))
+        deadline = parse_date(data.get("deadline", ""))
+        # a date that can't be read stays in extra as it was written, to_dict writes it back (until the field is changed)
+        for field, value in zip(cls.DATE_FIELDS, (date_added, deadline)):
+            if value is None and data.get(field):
+                extra = extra or {}
+                extra[field] = data[field]
+        return cls(data["id"], data.get("text", ""), done=data.get("done", False), theme=data.get("theme", "default"),
+                   date=date_added, deadline=deadline,
+                   priority=data.get("priority", 0), color=data.get("color", "normal"), extra=extra)
+
+    def to_dict(self):
+        data = {"id": self.id, "done": self.done, "theme": self.theme, "text": self.text,
+                "date": format_date(self.date), "deadline": format_date(self.deadline),
+                "priority": self.priority, "color": self.color}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        """a Task with the same fields, ex : for another thread to write while this one keeps changing the task"""
+        return Task(self.id, self.text, done=self.done, theme=self.theme, date=self.date, deadline=self.deadline,
+                    priority=self.priority, color=self.color, extra=dict(self.extra) if self.extra else None)
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
+
+
+class LazyTask(Task):
+    """
+    Task whose text stays in the JSON file until it's read (lazy loading of big todoLists)
+        source = (path of the JSON file, byte offset of the task in it, _file_state of the file when it was read)
+    The text is read on first use, then kept like the one of a Task
+    If the file was rewritten since (another program saved it), the offset means nothing anymore :
+    reading the text raises ValueError, the todoList must be read again (TodoList.refresh does it)
+    """
+    __slots__ = ("source",)
+
+    @classmethod
+    def from_source(cls, data, path, offset, state=None):
+        task = cls.from_dict(data)
+        Task.text.__delete__(task)      # the text is dropped, the dict it comes from too
+        task.source = (path, offset, _file_state(path) if state is None else state)
+        return task
+
+    @property
+    def text(self):
+        try:
+            return Task.text.__get__(self)
+        except AttributeError:
+            text = self._read_text()
+            Task.text.__set__(self, text)
+            return text
+
+    def _read_text(self):
+        path, offset, state = self.source
+        if _file_state(path) != state:
+            raise ValueError(self._stale_error())
+        try:
+            data = read_json_task_at(path, offset)
+        except (OSError, ValueError):
+            raise ValueError(self._stale_error())
+        return self._text_of(data)
+
+    def _stale_error(self):
+        return f"{self.source[0]} was rewritten since it was read, the text of the task {self.id} can't be read from it"
+
+    def _text_of(self, data):
+        if not isinstance(data, dict) or data.get("id") != self.id:      # same stats, but another task there
+            raise ValueError(self._stale_error())
+        return data.get("text", "")
+
+    @staticmethod
+    def read_texts(tasks):
+        """
+        read at once the texts of the LazyTasks of tasks not read yet (the other tasks are skipped)
+        one open of the file and reads in the order of the offsets, instead of one open per task :
+        for everything that uses every text (search indexes, save)
+        """
+        by_file = {}
+        for task in tasks:
+            if isinstance(task, LazyTask):
+                try:
+                    Task.text.__get__(task)     # already read
+                except AttributeError:
+                    path, offset, state = task.source
+                    by_file.setdefault((path, state), []).append((offset, task))
+        for (path, state), unread in by_file.items():
+            if _file_state(path) != state:
+                raise ValueError(unread[0][1]._stale_error())
+            unread.sort(key=lambda item: item[0])
+            try:
+                for (_, task), data in zip(unread, read_json_tasks_at(path, [offset for offset, _ in unread])):
+                    Task.text.__set__(task, task._text_of(data))
+            except (OSError, ValueError):
+                raise ValueError(unread[0][1]._stale_error())
+
+    @text.setter
+    def text(self, value):
+        Task.text.__set__(self, value)
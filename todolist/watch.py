@@ -0,0 +1,99 @@
+"""
+FileWatcher : calls a function when the files of a todoList change (inotify on Linux, else their stats are polled)
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+from .jsonfile import _file_state
+
+WATCH_POLL_S = 1.0                     # without inotify the files are checked this often (seconds)
+# inotify events of a folder : a file written, created, renamed (each save renames a new file over the old one) or deleted
+IN_MODIFY, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x2, 0x40, 0x80, 0x100, 0x200
+IN_Q_OVERFLOW = 0x4000                 # events were lost : anything may have changed
+IN_EVENT = struct.Struct("iIII")       # struct inotify_event : wd, mask, cookie, length of the name that follows
+
+
+def _libc():
+    """the C library if it has inotify (Linux), else None"""
+    if not hasattr(os, "O_CLOEXEC"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    FileWatcher(paths, on_change) : on_change() is called, from the thread of the watcher, after paths were changed
+    It can be called several times for one save, or for nothing (the folders are watched) : it must be cheap, ex : set an Event
+    stop() ends the watching
+    """
+
+    def __init__(self, paths, on_change, poll_interval=WATCH_POLL_S):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._fd = self._open_inotify()
+        self.mode = "polling" if self._fd is None else "inotify"
+        target = self._poll if self._fd is None else self._read_events
+        self._thread = threading.Thread(target=target, name="todo-watch", daemon=True)
+        self._thread.start()
+
+    def _open_inotify(self):
+        """inotify file descriptor watching the folders of paths, None if inotify isn't available"""
+        libc = _libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for folder in {os.path.dirname(path) for path in self.paths}:
+            if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:     # folder not readable...
+                os.close(fd)
+                return None
+        return fd
+
+    def _read_events(self):
+        names = {os.fsencode(os.path.basename(path)) for path in self.paths}
+        try:
+            while not self._stopped.is_set():
+                # with a timeout, to see stop()
+                if not select.select([self._fd], [], [], self.poll_interval)[0]:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                changed = False
+                pos = 0
+                while pos < len(data):
+                    _, mask, _, length = IN_EVENT.unpack_from(data, pos)
+                    pos += IN_EVENT.size
+                    name = data[pos:pos + length].rstrip(b"\0")
+                    pos += length
+                    changed = changed or mask & IN_Q_OVERFLOW or name in names
+                if changed and not self._stopped.is_set():
+                    self.on_change()
+        finally:
+            os.close(self._fd)
+
+    def _poll(self):
+        states = [_file_state(path) for path in self.paths]
+        while not self._stopped.wait(self.poll_interval):
+            new_states = [_file_state(path) for path in self.paths]
+            if new_states != states:
+                states = new_states
+                self.on_change()
+
+    def stop(self):
+        """the thread ends within poll_interval, nothing is called after this"""
+        self._stopped.set()